@@ -1,46 +1,19 @@
+import io
 import os
 import sys
-import tempfile
 import sqlite3
-from textwrap import wrap  # Metni belirli karakter sınırına göre sarmak için
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest
 from datetime import datetime
 
 # Flask imports
-from flask import Flask, render_template, request, send_file, send_from_directory, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, send_file, send_from_directory, redirect, url_for, flash
 
-# PyInstaller için reportlab import'larını try-except ile sarmalayalım
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.pdfbase import pdfmetrics
-    # Barcode import'unu ayrı try-catch ile yapalım
-    try:
-        from reportlab.graphics.barcode import code128
-        BARCODE_AVAILABLE = True
-    except Exception as barcode_error:
-        print(f"Barcode modülü yüklenemedi: {barcode_error}")
-        BARCODE_AVAILABLE = False
-        code128 = None
-    REPORTLAB_AVAILABLE = True
-except Exception as reportlab_error:
-    print(f"ReportLab yüklenemedi: {reportlab_error}")
-    REPORTLAB_AVAILABLE = False
-    BARCODE_AVAILABLE = False
-    canvas = None
-    TTFont = None
-    pdfmetrics = None
-    code128 = None
-
-# QR Code import
-try:
-    import qrcode
-    QR_AVAILABLE = True
-except Exception as qr_error:
-    print(f"QRCode modülü yüklenemedi: {qr_error}")
-    QR_AVAILABLE = False
-    qrcode = None
+import inventory_db
+import image_derivatives
+import web_utils
+import label_engine
+import inventory_export
 
 # Pandas import (Excel için)
 try:
@@ -71,6 +44,9 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# Etiket fontlarını başlangıçta bir kez kaydet
+label_engine.register_fonts(resource_path("fonts"))
+
 # Flask uygulaması - PyInstaller için template ve static path düzeltmesi
 if getattr(sys, 'frozen', False):
     # PyInstaller ile çalışırken
@@ -83,6 +59,9 @@ else:
 
 app.secret_key = "your_secret_key"
 
+# HTML/JSON yanıtları istemci destekliyorsa gzip/brotli ile sıkıştırılır
+web_utils.init_compression(app)
+
 # Database.db dosyası exe ile aynı klasörde olacak
 DATABASE_NAME = "database.db"
 
@@ -92,15 +71,17 @@ if getattr(sys, 'frozen', False):
     app_dir = os.path.dirname(sys.executable)
     DATABASE = os.path.join(app_dir, DATABASE_NAME)
     UPLOAD_FOLDER = os.path.join(app_dir, 'static', 'uploads')
+    DERIVATIVE_FOLDER = os.path.join(app_dir, 'static', 'derivatives')
 else:
     # Normal Python ile çalışırken - mevcut dizin
     DATABASE = DATABASE_NAME
     UPLOAD_FOLDER = 'static/uploads'
+    DERIVATIVE_FOLDER = 'static/derivatives'
 
 # Database yoksa boş bir tane oluştur
 if not os.path.exists(DATABASE):
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = inventory_db.connect(DATABASE)
         conn.close()
         print(f"Database oluşturuldu: {DATABASE}")
     except Exception as e:
@@ -119,8 +100,7 @@ def allowed_file(filename):
 
 # Veritabanı bağlantısı
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # Dict-like erişim sağlar
+    conn = inventory_db.connect(DATABASE, row_factory=sqlite3.Row)  # Dict-like erişim sağlar
     return conn
 
 # Veritabanını başlatma
@@ -148,6 +128,8 @@ def initialize_database():
         pass
 
     conn.commit()
+
+    inventory_db.ensure_schema(conn)
     conn.close()
 
 
@@ -155,35 +137,14 @@ def initialize_database():
 def print_label(id):
     try:
         # ReportLab ve Barcode modüllerinin varlığını kontrol et
-        if not REPORTLAB_AVAILABLE:
+        if not label_engine.REPORTLAB_AVAILABLE:
             return "PDF oluşturucu (ReportLab) yüklü değil!", 500
         
-        if not BARCODE_AVAILABLE:
+        if not label_engine.BARCODE_AVAILABLE:
             return "Barkod oluşturucu yüklü değil!", 500
             
         id = int(id)  # ID'yi int'e çevir
-        size = request.args.get("size", "40x15")
-
-        # 80 DPI için doğru ölçüler (piksel cinsinden)
-        valid_sizes = {"40x15": (126, 44), "40x20": (126, 60), "40x30": (126, 90)}
-
-        if size not in valid_sizes:
-            size = "40x15"
-        
-        # Font dosyalarını güvenli şekilde yükle
-        try:
-            if pdfmetrics and TTFont:
-                pdfmetrics.registerFont(TTFont("Roboto", resource_path("fonts/Roboto-Regular.ttf")))
-                pdfmetrics.registerFont(TTFont("Robotom", resource_path("fonts/Roboto-Bold.ttf")))
-                pdfmetrics.registerFont(TTFont("Oswald", resource_path("fonts/Oswald-Bold.ttf")))
-                font_available = True
-            else:
-                font_available = False
-        except Exception as font_error:
-            print(f"Font yükleme hatası: {font_error}")
-            font_available = False
-
-        width, height = valid_sizes[size]
+        size = request.args.get("size", label_engine.DEFAULT_SIZE)
 
         conn = get_db_connection()
         item = conn.execute("SELECT * FROM inventory WHERE id = ?", (id,)).fetchone()
@@ -192,68 +153,57 @@ def print_label(id):
         if not item:
             return "Ürün bulunamadı!", 404
 
-        item = {key: item[key] for key in item.keys()}
-        item_number = item["item_number"]
-        depot_info = item["depot_info"] or ""
-        title = item["title"] or ""
-        variation_details = item["variation_details"] if item["variation_details"] else "N/A"
+        # PDF bellekte üretilir (aynı içerik için önbellekten) - geçici dosya yok
+        pdf = label_engine.render_label(item, size)
+        return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True,
+                         download_name=f"label_{item['item_number']}.pdf")
 
-        # Ürün adını satırlara böl
-        wrapped_title = wrap(title, width=24)[:2]
+    except Exception as e:
+        print(f"PDF oluşturma hatası: {e}")
+        return f"PDF oluşturulamadı: {str(e)}", 500
 
-        # PDF oluşturma (geçici dizinde)
-        pdf_path = os.path.join(tempfile.gettempdir(), f"label_{item['item_number']}.pdf")
-        c = canvas.Canvas(pdf_path, pagesize=(width, height))
 
-        # 1D Barkod
-        barcode = code128.Code128(item["item_number"], barHeight=9, barWidth=0.7)
-        barcode.drawOn(c, -13, height - 9)
+@app.route("/print-labels")
+def print_labels():
+    """Birden çok ürün için tek PDF: /print-labels?ids=1,2,3&copies=2,1,5 (copies tek değer de olabilir)"""
+    try:
+        if not label_engine.REPORTLAB_AVAILABLE:
+            return "PDF oluşturucu (ReportLab) yüklü değil!", 500
 
-        # Font seçimi
-        font_name = "Oswald" if font_available else "Helvetica"
-        
-        # Barkod altı yazı
-        c.setFont(font_name, 5)
-        text_x_position = -24 + (barcode.width / 2) - (len(item_number) + len(depot_info))
-        c.drawString(text_x_position, height - 14, f"{item_number} | {depot_info}")
-
-        # Ürün Adı
-        c.setFont(font_name, 7)
-        y_position = height - 22
-        for line in wrapped_title:
-            c.drawString(5, y_position, line)
-            y_position -= 9
-
-        # Fiyat
-        c.setFont(font_name, 10)
-        c.drawString(15, y_position - 1, f"{item['start_price']} {item['currency']}")
-
-        # QR Kodu ekle (eğer mevcut ise)
-        if QR_AVAILABLE and qrcode:
-            try:
-                qr = qrcode.QRCode(box_size=2, border=1)
-                qr.add_data(f"{item_number} | {title} | {variation_details}| {item['start_price']} {item['currency']} | {depot_info}")
-                qr_img = qr.make_image(fill="black", back_color="white")
-                
-                # Geçici QR dosyası
-                qr_path = os.path.join(tempfile.gettempdir(), f"temp_qr_{item_number}.png")
-                qr_img.save(qr_path)
-
-                c.drawImage(qr_path, width - 44, 2, width=44, height=43)
-                
-                # Geçici dosyayı temizle
-                try:
-                    os.remove(qr_path)
-                except:
-                    pass
-            except Exception as qr_error:
-                print(f"QR kod oluşturma hatası: {qr_error}")
-        else:
-            print("QR kod modülü mevcut değil, QR kod atlanıyor")
+        if not label_engine.BARCODE_AVAILABLE:
+            return "Barkod oluşturucu yüklü değil!", 500
+
+        try:
+            ids = [int(value) for value in request.args.get("ids", "").split(",") if value.strip()]
+            copies = [int(value) for value in request.args.get("copies", "1").split(",") if value.strip()]
+        except ValueError:
+            return "ids ve copies virgülle ayrılmış sayılar olmalı!", 400
 
-        c.save()
+        if not ids:
+            return "En az bir ürün ID'si gerekli!", 400
+        if len(copies) == 1:
+            copies = copies * len(ids)
+        if len(copies) != len(ids) or any(count < 1 for count in copies):
+            return "copies her ürün için pozitif bir sayı olmalı!", 400
 
-        return send_file(pdf_path, as_attachment=True)
+        size = request.args.get("size", label_engine.DEFAULT_SIZE)
+
+        conn = get_db_connection()
+        placeholders = ",".join("?" * len(set(ids)))
+        rows = conn.execute(f"SELECT * FROM inventory WHERE id IN ({placeholders})", list(set(ids))).fetchall()
+        conn.close()
+
+        items = {row["id"]: row for row in rows}
+        missing = [str(item_id) for item_id in ids if item_id not in items]
+        if missing:
+            return f"Ürün bulunamadı: {', '.join(missing)}", 404
+
+        try:
+            pdf = label_engine.render_labels([(items[item_id], count) for item_id, count in zip(ids, copies)], size)
+        except ValueError as e:
+            return str(e), 400
+        return send_file(io.BytesIO(pdf), mimetype="application/pdf", as_attachment=True,
+                         download_name=f"labels_{len(ids)}_items.pdf")
 
     except Exception as e:
         print(f"PDF oluşturma hatası: {e}")
@@ -268,77 +218,111 @@ def index():
         search_query = request.args.get("search", "").strip()  # Arama için sorgu al
         group_mode = request.args.get("group", "0") == "1"  # Gruplama modu
 
-        page = request.args.get("page", 1, type=int)  # Sayfa numarasını al
         per_page = 50  # Her sayfada 50 ürün gösterilecek
 
-        if group_mode:
-            # Gruplamada farklı SQL sorgusu - aynı item_number'a sahip ürünleri grupla
-            if search_query:
-                sql_query = """
-                    SELECT 
-                        MIN(id) as id,
-                        item_number,
-                        title,
-                        GROUP_CONCAT(DISTINCT variation_details) as variation_details,
-                        SUM(available_quantity) as available_quantity,
-                        currency,
-                        AVG(start_price) as start_price,
-                        depot_info,
-                        (SELECT image_path FROM inventory i2 WHERE i2.item_number = inventory.item_number AND i2.image_path IS NOT NULL LIMIT 1) as image_path,
-                        COUNT(*) as variant_count
-                    FROM inventory
-                    WHERE item_number LIKE ? OR title LIKE ? OR variation_details LIKE ?
-                    GROUP BY item_number, title, currency, depot_info
-                    ORDER BY MIN(id) DESC
-                """
-                params = (f"%{search_query}%", f"%{search_query}%", f"%{search_query}%")
-            else:
-                sql_query = """
-                    SELECT 
-                        MIN(id) as id,
-                        item_number,
-                        title,
-                        GROUP_CONCAT(DISTINCT variation_details) as variation_details,
-                        SUM(available_quantity) as available_quantity,
-                        currency,
-                        AVG(start_price) as start_price,
-                        depot_info,
-                        (SELECT image_path FROM inventory i2 WHERE i2.item_number = inventory.item_number AND i2.image_path IS NOT NULL LIMIT 1) as image_path,
-                        COUNT(*) as variant_count
-                    FROM inventory
-                    GROUP BY item_number, title, currency, depot_info
-                    ORDER BY MIN(id) DESC
-                    LIMIT ? OFFSET ?
-                """
-                params = (per_page, (page - 1) * per_page)
-        else:
-            # Normal listeleme - eski kod
-            sql_query = """
-                SELECT id, item_number, title, variation_details, available_quantity, 
-                       currency, start_price, depot_info, image_path 
+        # Keyset (seek) sayfalama imleçleri - OFFSET yerine son görülen id'den devam edilir
+        after_id = request.args.get("after_id", type=int)  # Sonraki sayfa: bu id'den küçükler
+        before_id = request.args.get("before_id", type=int)  # Önceki sayfa: bu id'den büyükler
+        after_rank = request.args.get("after_rank", type=float)  # Arama sonuçlarında alaka imleci
+        backwards = after_id is None and before_id is not None
+        # Sayfa numarası sadece gösterim içindir, sorguyu etkilemez
+        page = request.args.get("page", 1, type=int) if (after_id or before_id) else 1
+        fetch_limit = per_page + 1  # Bir fazlası: sonraki sayfa var mı?
+
+        if group_mode and not search_query:
+            # Gruplama modu - trigger'larla güncellenen özet tablodan indeksli okuma
+            sql_query, params = inventory_db.grouped_page_query(
+                after_id=None if backwards else after_id,
+                before_id=before_id if backwards else None,
+                limit=fetch_limit,
+            )
+        elif group_mode:
+            # Aramada gruplar sadece eşleşen kayıtlardan hesaplanır (FTS ile daraltılmış küme)
+            having_clause = ""
+            search_sql, search_params = inventory_db.search_condition(conn, search_query)
+            where_clause = f"WHERE {search_sql}"
+            params = list(search_params)
+            if backwards:
+                having_clause = "HAVING MIN(id) > ?"
+                params.append(before_id)
+            elif after_id is not None:
+                having_clause = "HAVING MIN(id) < ?"
+                params.append(after_id)
+            params.append(fetch_limit)
+
+            sql_query = f"""
+                SELECT 
+                    MIN(id) as id,
+                    item_number,
+                    title,
+                    GROUP_CONCAT(DISTINCT variation_details) as variation_details,
+                    SUM(available_quantity) as available_quantity,
+                    currency,
+                    AVG(start_price) as start_price,
+                    depot_info,
+                    (SELECT image_path FROM inventory i2 WHERE i2.item_number = inventory.item_number AND i2.image_path IS NOT NULL LIMIT 1) as image_path,
+                    COUNT(*) as variant_count
                 FROM inventory
-                {}
-                ORDER BY id DESC
-                {}
+                {where_clause}
+                GROUP BY item_number, title, currency, depot_info
+                {having_clause}
+                ORDER BY MIN(id) {"ASC" if backwards else "DESC"}
+                LIMIT ?
             """
+        else:
+            list_columns = """id, item_number, title, variation_details, available_quantity,
+                       currency, start_price, depot_info, image_path"""
 
             if search_query:
-                # Eğer arama yapılmışsa sadece eşleşen ürünleri getir
-                filter_condition = "WHERE item_number LIKE ? OR title LIKE ? OR variation_details LIKE ?"
-                limit_clause = ""
-                params = (f"%{search_query}%", f"%{search_query}%", f"%{search_query}%")
+                # Arama sonuçları alaka sırasında; imleç (alaka, id) çiftidir, geri gidiş ilk sayfaya döner
+                backwards = False
+                search_after = (after_rank, after_id) if after_id is not None else None
+                sql_query, params = inventory_db.ranked_search_query(
+                    conn, search_query, list_columns, after=search_after, limit=fetch_limit
+                )
             else:
-                # Eğer arama yoksa, normal listele ve sayfalama uygula
-                filter_condition = ""
-                limit_clause = "LIMIT ? OFFSET ?"
-                params = (per_page, (page - 1) * per_page)
-
-            # SQL sorgusunu oluştur
-            sql_query = sql_query.format(filter_condition, limit_clause)
+                # Eğer arama yoksa, id üzerinden keyset sayfalama uygula
+                if backwards:
+                    cursor_clause, params = "WHERE id > ?", (before_id, fetch_limit)
+                elif after_id is not None:
+                    cursor_clause, params = "WHERE id < ?", (after_id, fetch_limit)
+                else:
+                    cursor_clause, params = "", (fetch_limit,)
+                sql_query = f"""
+                    SELECT {list_columns}
+                    FROM inventory
+                    {cursor_clause}
+                    ORDER BY id {"ASC" if backwards else "DESC"}
+                    LIMIT ?
+                """
 
         # SQL sorgusunu çalıştır
         rows = conn.execute(sql_query, params).fetchall()
 
+        # Fazladan çekilen satır, o yönde başka sayfa olduğunu gösterir
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = after_id is not None, has_more
+
+        # Sonraki/önceki sayfa imleçleri
+        next_cursor = None
+        prev_cursor = None
+        if rows:
+            if search_query and not group_mode:
+                next_cursor = {"after_id": rows[-1]["search_rowid"]}
+                if rows[-1]["search_rank"] is not None:
+                    next_cursor["after_rank"] = rows[-1]["search_rank"]
+            else:
+                next_cursor = {"after_id": rows[-1]["id"]}
+                prev_cursor = {"before_id": rows[0]["id"]}
+
+        # Resimlerin varlığını manifest'ten toplu oku - satır başına dosya sistemi kontrolü yok
+        image_paths = inventory_db.image_presence(conn, [row["image_path"] for row in rows], UPLOAD_FOLDER)
+
         # Her ürün için düzgün bir sözlük oluştur
         inventory_list = []
         for row in rows:
@@ -362,9 +346,11 @@ def index():
                         item[col] = None
                 # image_path değeri
                 elif col == 'image_path' and i < len(row):
-                    # Resim yolu verinin kontrolü
-                    if row[i] and os.path.exists(row[i]):
+                    # Resim yolu verinin kontrolü (manifest'e göre dosya mevcut mu)
+                    if row[i] and image_paths.get(row[i]) == row[i]:
                         item[col] = row[i]
+                        # Resim URL'sinin sürümü - dosya adı zaman damgalı olduğu için tarayıcı önbelleğinde kalabilir
+                        item['image_version'] = os.path.basename(row[i])
                     else:
                         item[col] = None
                 elif i < len(row):
@@ -392,33 +378,49 @@ def index():
             print("DEBUG: Toplam ürün sayısı:", len(inventory_list))
 
         # Sayfalama için toplam ürün sayısını al
+        # Aramada eşleşmeler sıralama sınırına kadar sayılır - her sayfada tüm eşleşme kümesi taranmaz
+        count_limit = inventory_db.SEARCH_RANK_CANDIDATES
         if group_mode:
             # Gruplama modunda: Benzersiz ürün numarası sayısını al
             if search_query:
-                total_items = conn.execute("""
-                    SELECT COUNT(DISTINCT item_number) 
-                    FROM inventory 
-                    WHERE item_number LIKE ? OR title LIKE ? OR variation_details LIKE ?
-                """, (f"%{search_query}%", f"%{search_query}%", f"%{search_query}%")).fetchone()[0]
+                search_sql, search_params = inventory_db.search_condition(conn, search_query)
+                total_items = conn.execute(f"""
+                    SELECT COUNT(*) FROM (
+                        SELECT DISTINCT item_number
+                        FROM inventory
+                        WHERE {search_sql}
+                        LIMIT ?
+                    )
+                """, list(search_params) + [count_limit + 1]).fetchone()[0]
             else:
-                total_items = conn.execute("SELECT COUNT(DISTINCT item_number) FROM inventory").fetchone()[0]
+                total_items = inventory_db.get_stats(conn)["distinct_items"]
         else:
             # Normal modda: Toplam ürün sayısını al
             if search_query:
-                total_items = conn.execute("""
-                    SELECT COUNT(*) 
-                    FROM inventory 
-                    WHERE item_number LIKE ? OR title LIKE ? OR variation_details LIKE ?
-                """, (f"%{search_query}%", f"%{search_query}%", f"%{search_query}%")).fetchone()[0]
+                search_sql, search_params = inventory_db.search_condition(conn, search_query)
+                total_items = conn.execute(f"""
+                    SELECT COUNT(*) FROM (
+                        SELECT 1
+                        FROM inventory
+                        WHERE {search_sql}
+                        LIMIT ?
+                    )
+                """, list(search_params) + [count_limit + 1]).fetchone()[0]
             else:
-                total_items = conn.execute("SELECT COUNT(*) FROM inventory").fetchone()[0]
-        
-        total_pages = (total_items + per_page - 1) // per_page  # Toplam sayfa sayısını hesapla
+                total_items = inventory_db.get_stats(conn)["total_rows"]
+
+        if search_query and total_items > count_limit:
+            # Sınırdan fazla eşleşme: "20+" gibi gösterilir
+            total_pages = f"{(count_limit + per_page - 1) // per_page}+"
+        else:
+            total_pages = (total_items + per_page - 1) // per_page  # Toplam sayfa sayısını hesapla
 
         conn.close()
 
         return render_template("index.html", inventory=inventory_list, page=page, total_pages=total_pages,
-                               search_query=search_query, group_mode=group_mode)
+                               search_query=search_query, group_mode=group_mode,
+                               has_prev=has_prev, has_next=has_next,
+                               next_cursor=next_cursor, prev_cursor=prev_cursor)
 
     except Exception as e:
         print(f"Indeks rotasında hata: {str(e)}")
@@ -517,6 +519,7 @@ def add_new_item():
 
                 # Resim yolunu güncelle
                 conn.execute("UPDATE inventory SET image_path = ? WHERE id = ?", (image_path, new_item_id))
+                inventory_db.record_image(conn, image_path)
                 conn.commit()
 
         conn.close()
@@ -569,6 +572,7 @@ def edit_item(id):
     # Dict dönüşümü yaparak HTML'e gönderelim - ID'yi int'e çevir
     item_dict = dict(item)
     item_dict['id'] = int(item_dict['id']) if item_dict['id'] is not None else None
+    item_dict['image_version'] = os.path.basename(item_dict['image_path']) if item_dict.get('image_path') else None
 
     return render_template("edit_item.html", item=item_dict)
 
@@ -625,6 +629,7 @@ def upload_image(id):
                     os.remove(old_image)
                 except:
                     pass
+                inventory_db.record_image(conn, old_image)
 
             # Güvenli dosya adı oluştur - Standart format
             filename = secure_filename(file.filename)
@@ -641,6 +646,7 @@ def upload_image(id):
             # Veritabanını güncelle
             conn.execute("UPDATE inventory SET image_path = ? WHERE id = ?",
                          (file_path, id))
+            inventory_db.record_image(conn, file_path)
             conn.commit()
             conn.close()
 
@@ -680,7 +686,12 @@ def get_image(id):
         import base64
         # 1x1 şeffaf PNG data
         tiny_png = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==')
-        return Response(tiny_png, mimetype='image/png')
+        return web_utils.cached_bytes_response(tiny_png, 'image/png')
+
+    # İstenen boyut: thumb (liste), medium (büyük önizleme) veya full (orijinal)
+    size = request.args.get("size", "full")
+    # v parametresi güncel dosya adıyla (zaman damgalı) eşleşiyorsa URL değişmez içerik gösterir
+    immutable = request.args.get("v") == os.path.basename(item['image_path'])
 
     # Resim dosyasını gönder - exe uyumlu
     try:
@@ -691,15 +702,25 @@ def get_image(id):
             upload_dir = os.path.join(exe_dir, 'static', 'uploads')
             filename = os.path.basename(item['image_path'])
             full_path = os.path.join(upload_dir, filename)
-            
-            if os.path.exists(full_path):
-                return send_from_directory(upload_dir, filename)
+            directory = upload_dir
         else:
             # Normal durumda orijinal path kullan
             directory = os.path.dirname(item['image_path'])
             filename = os.path.basename(item['image_path'])
-            if os.path.exists(item['image_path']):
-                return send_from_directory(directory, filename)
+            full_path = item['image_path']
+
+        if os.path.exists(full_path):
+            if size != "full":
+                # Küçük kopya - ilk istekte üretilir, sonra diskten gönderilir
+                fmt = image_derivatives.choose_format(request.headers.get("Accept"))
+                derivative_path = image_derivatives.get_derivative(full_path, size, DERIVATIVE_FOLDER, fmt)
+                if derivative_path:
+                    response = web_utils.send_cached_file(DERIVATIVE_FOLDER, os.path.basename(derivative_path),
+                                                          immutable=immutable)
+                    # Aynı URL Accept başlığına göre WebP veya JPEG döndürebilir
+                    response.vary.add("Accept")
+                    return response
+            return web_utils.send_cached_file(directory, filename, immutable=immutable)
     except Exception as e:
         print(f"Resim gönderme hatası: {e}")
     
@@ -707,7 +728,7 @@ def get_image(id):
     from flask import Response
     import base64
     tiny_png = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==')
-    return Response(tiny_png, mimetype='image/png')
+    return web_utils.cached_bytes_response(tiny_png, 'image/png')
 
 
 # Özel test sayfası
@@ -752,53 +773,90 @@ def ip_monitor_dashboard():
 # Excel'e aktarma fonksiyonu
 @app.route("/export-excel", methods=["GET"])
 def export_excel():
-    try:
+    if not inventory_export.OPENPYXL_AVAILABLE:
+        flash("Excel dosyası oluşturulamadı: openpyxl yüklü değil", "error")
+        return redirect(url_for("index"))
+
+    def produce_rows():
+        # Üretici thread'de çalışır - bağlantı burada açılır ve satırlar parça parça okunur
         conn = get_db_connection()
-        
-        # Tüm envanter verilerini al (id ve image_path dahil)
-        items = conn.execute("""
-            SELECT id, item_number, title, variation_details, available_quantity, 
-                   currency, start_price, depot_info, image_path 
-            FROM inventory 
-            ORDER BY id DESC
-        """).fetchall()
-        
+        try:
+            cursor = conn.execute("""
+                SELECT id, item_number, title, COALESCE(variation_details, ''), available_quantity,
+                       currency, start_price, COALESCE(depot_info, ''), COALESCE(image_path, '')
+                FROM inventory
+                ORDER BY id DESC
+            """)
+            yield from inventory_export.iter_rows(cursor)
+        finally:
+            conn.close()
+
+    # Dosya üretildikçe gönderilir - geçici dosya yok, bellek kullanımı tablo boyutundan bağımsız
+    excel_filename = f"envanter_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    return Response(
+        inventory_export.stream_xlsx(produce_rows, inventory_export.EXPORT_COLUMNS),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename={excel_filename}"},
+    )
+
+
+def _open_export(default_columns):
+    """Dışa aktarma parametrelerini (columns, depot, search) okuyup sorguyu başlatır"""
+    conn = get_db_connection()
+    try:
+        columns = inventory_export.parse_columns(conn, request.args.get("columns"), default_columns)
+        sql, params = inventory_export.export_query(
+            conn, columns,
+            depot=request.args.get("depot", "").strip() or None,
+            search=request.args.get("search", "").strip() or None,
+        )
+        cursor = conn.execute(sql, params)
+    except Exception:
         conn.close()
-        
-        # Pandas DataFrame oluştur
-        df_data = []
-        for item in items:
-            df_data.append({
-                'id': item['id'],
-                'item_number': item['item_number'],
-                'title': item['title'],
-                'variation_details': item['variation_details'] or '',
-                'available_quantity': item['available_quantity'],
-                'currency': item['currency'],
-                'start_price': item['start_price'],
-                'depot_info': item['depot_info'] or '',
-                'image_path': item['image_path'] or ''
-            })
-        
-        df = pd.DataFrame(df_data)
-        
-        # Excel dosyasını geçici dizine kaydet
-        excel_filename = f"envanter_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        excel_path = os.path.join(tempfile.gettempdir(), excel_filename)
-        
-        # Excel dosyasını oluştur
-        df.to_excel(excel_path, index=False, sheet_name='Envanter')
-        
-        # Dosyayı kullanıcıya gönder
-        return send_file(excel_path, as_attachment=True, download_name=excel_filename)
-        
-    except Exception as e:
-        print(f"Excel export hatası: {e}")
-        import traceback
-        traceback.print_exc()
-        flash(f"Excel dosyası oluşturulamadı: {str(e)}", "error")
+        raise
+    return conn, cursor, columns
+
+
+# CSV olarak akışla dışa aktarma: /export.csv?columns=id,title&depot=A1&search=...
+@app.route("/export.csv", methods=["GET"])
+def export_csv():
+    try:
+        conn, cursor, columns = _open_export(inventory_export.EXPORT_COLUMNS)
+    except ValueError as e:
+        return str(e), 400
+    filename = f"envanter_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return web_utils.stream_rows(conn, inventory_export.iter_csv(cursor, columns),
+                                 "text/csv; charset=utf-8", filename)
+
+
+# Satır başına bir JSON nesnesi (NDJSON) olarak akışla dışa aktarma
+@app.route("/export.ndjson", methods=["GET"])
+def export_ndjson():
+    try:
+        conn, cursor, columns = _open_export(inventory_export.EXPORT_COLUMNS)
+    except ValueError as e:
+        return str(e), 400
+    filename = f"envanter_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+    return web_utils.stream_rows(conn, inventory_export.iter_ndjson(cursor, columns),
+                                 "application/x-ndjson", filename)
+
+
+# Parquet / Arrow IPC anlık görüntüsü: /export-snapshot?format=parquet|arrow
+@app.route("/export-snapshot", methods=["GET"])
+def export_snapshot():
+    if not inventory_export.PYARROW_AVAILABLE:
+        flash("Anlık görüntü oluşturulamadı: pyarrow yüklü değil", "error")
         return redirect(url_for("index"))
 
+    fmt = "arrow" if request.args.get("format") == "arrow" else "parquet"
+    extension = "arrow" if fmt == "arrow" else "parquet"
+    filename = f"envanter_snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(
+        inventory_export.stream_snapshot(get_db_connection, fmt),
+        mimetype="application/vnd.apache.arrow.file" if fmt == "arrow" else "application/vnd.apache.parquet",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 
 # Uygulama başlatma
 if __name__ == "__main__":
@@ -829,6 +887,8 @@ if __name__ == "__main__":
     print("📊 Veritabanı hazırlanıyor...")
     try:
         initialize_database()
+        # Resim manifest'ini arka planda dosya sistemiyle eşitle
+        inventory_db.start_image_reconciler(DATABASE, UPLOAD_FOLDER)
         print("✅ Sistem hazır!")
     except Exception as e:
         print(f"❌ Veritabanı hatası: {e}")
@@ -0,0 +1,157 @@
+"""
+Masaüstü uygulaması için arka plan işleri
+Veritabanı sorguları ve dosya işlemleri worker thread'lerde çalışır; sonuçlar, ilerleme ve
+hata bilgisi root.after ile ana thread'e parça parça aktarılır (Tk nesnelerine sadece ana thread dokunur)
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import Toplevel, Label, Button, ttk
+
+# Ana thread'in kuyruğu boşaltma aralığı (ms)
+POLL_INTERVAL_MS = 50
+# Bir boşaltma turunda arayüze ayrılan en fazla süre (saniye) - kalan parçalar sonraki tura kalır
+DRAIN_BUDGET_SECONDS = 0.015
+
+
+class TaskCancelled(Exception):
+    """İş kullanıcı tarafından iptal edildi"""
+
+
+class Task:
+    """Worker thread'de çalışan işin tutamacı
+
+    Worker tarafında: post(parça) sonuçları, progress(sayı) ilerlemeyi iletir; check() iptal
+    edildiyse TaskCancelled fırlatır. Ana thread tarafında: cancel() işi iptal eder.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.cancel_event = threading.Event()
+        self._messages = queue.Queue()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+    def post(self, chunk):
+        """Bir sonuç parçasını ana thread'e gönderir (iptal edildiyse TaskCancelled)"""
+        self.check()
+        self._messages.put(("chunk", chunk))
+
+    def progress(self, done, total=None):
+        """İlerleme bildirir ve iptal kontrolü yapar - uzun döngülerde düzenli çağrılmalı"""
+        self.check()
+        self._messages.put(("progress", (done, total)))
+
+
+class TaskRunner:
+    """İşleri thread havuzunda çalıştırır ve geri çağırmaları ana thread'de yürütür
+
+    submit(..., key=...) aynı anahtarlı önceki işi iptal eder (ör. arka arkaya iki arama -
+    sadece sonuncunun sonucu tabloya yazılır).
+    """
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="desktop-task")
+        self._active = {}
+
+    def submit(self, fn, *args, name=None, key=None, on_chunk=None, on_progress=None,
+               on_done=None, on_error=None, on_cancel=None):
+        """fn(task, *args) worker thread'de çalışır; dönüş değeri on_done'a verilir"""
+        if key is not None and key in self._active:
+            self._active[key].cancel()
+        task = Task(name or getattr(fn, "__name__", "task"))
+        if key is not None:
+            self._active[key] = task
+        task.future = self._executor.submit(fn, task, *args)
+        handlers = (on_chunk, on_progress, on_done, on_error, on_cancel)
+        self.root.after(POLL_INTERVAL_MS, self._poll, task, key, handlers)
+        return task
+
+    def _poll(self, task, key, handlers):
+        on_chunk, on_progress, on_done, on_error, on_cancel = handlers
+        deadline = time.monotonic() + DRAIN_BUDGET_SECONDS
+        latest_progress = None
+        # Parçalar zaman bütçesi içinde işlenir; arayüz olayları arada çalışmaya devam eder
+        while time.monotonic() < deadline:
+            try:
+                kind, payload = task._messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest_progress = payload
+            elif on_chunk is not None and not task.cancelled:
+                on_chunk(payload)
+        if latest_progress is not None and on_progress is not None and not task.cancelled:
+            on_progress(*latest_progress)
+
+        if not task.future.done() or not task._messages.empty():
+            self.root.after(POLL_INTERVAL_MS, self._poll, task, key, handlers)
+            return
+
+        if key is not None and self._active.get(key) is task:
+            del self._active[key]
+        error = task.future.exception()
+        if task.cancelled or isinstance(error, TaskCancelled):
+            if on_cancel is not None:
+                on_cancel()
+        elif error is not None:
+            print(f"Arka plan işi hatası ({task.name}): {error}")
+            if on_error is not None:
+                on_error(error)
+        elif on_done is not None:
+            on_done(task.future.result())
+
+    def shutdown(self):
+        """Çalışan işleri iptal eder; uygulama kapanırken çağrılır"""
+        for task in list(self._active.values()):
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProgressDialog:
+    """İptal düğmeli ilerleme penceresi; total bilinmiyorsa belirsiz (kayan) çubuk gösterir"""
+
+    def __init__(self, root, title, task, total=None, unit="rows"):
+        self.total = total
+        self.unit = unit
+        self.window = Toplevel(root)
+        self.window.title(title)
+        self.window.transient(root)
+        self.label = Label(self.window, text=f"0 / {total} {unit}" if total else "Working...")
+        self.label.pack(padx=20, pady=(15, 5))
+        if total:
+            self.bar = ttk.Progressbar(self.window, length=300, mode="determinate", maximum=max(total, 1))
+        else:
+            self.bar = ttk.Progressbar(self.window, length=300, mode="indeterminate")
+            self.bar.start(15)
+        self.bar.pack(padx=20, pady=5)
+        Button(self.window, text="Cancel", command=task.cancel).pack(pady=(5, 15))
+        self.window.protocol("WM_DELETE_WINDOW", task.cancel)
+
+    def update(self, done, total=None):
+        total = total or self.total
+        if total:
+            if str(self.bar["mode"]) != "determinate":
+                self.bar.stop()
+                self.bar.configure(mode="determinate")
+            self.bar.configure(maximum=max(total, 1), value=done)
+            self.label.config(text=f"{done} / {total} {self.unit}")
+        else:
+            self.label.config(text=f"{done} {self.unit}")
+
+    def close(self):
+        if self.window.winfo_exists():
+            self.window.destroy()
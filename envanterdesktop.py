@@ -1,9 +1,5 @@
-import qrcode
 import tkinter as tk
 from tkinter import Toplevel, Label, Button, ttk, filedialog, messagebox
-from reportlab.pdfgen import canvas
-from reportlab.graphics.barcode import code128
-from reportlab.lib.pagesizes import letter
 import sqlite3
 import sys
 import os
@@ -15,6 +11,16 @@ import re
 import random
 import string
 import time
+from collections import OrderedDict
+
+import inventory_db
+import label_engine
+import inventory_export
+import virtual_tree
+import desktop_tasks
+
+# Tüm ekranlar aynı bağlantı havuzunu kullanır (WAL, busy_timeout)
+DATABASE = "database.db"
 
 
 class InventoryApp:
@@ -50,15 +56,32 @@ class InventoryApp:
         # TreeView için ikonları saklayacak dictionary
         self.tree_icons = {}
         
-        # Resim önizleme penceresi için değişken
+        # Resim önizleme penceresi - bir kez oluşturulur, sonra gizlenip yeniden gösterilir
         self.preview_window = None
+        self.preview_label = None
+        self.preview_row = None  # Farenin üzerinde olduğu satır; aynı satırda tekrar işlenmez
+        self.preview_after = None  # Bekleyen (gecikmeli) önizleme
+        # (resim yolu, manifest mtime) -> küçültülmüş PhotoImage; en son kullanılan sonda (LRU)
+        self.preview_cache = OrderedDict()
+        # Satır (rowid) -> (resim yolu, manifest mtime) veya None; satırlar okunurken doldurulur,
+        # fare hareketinde sorgu ve dosya sistemi kontrolü yapılmaz
+        self.row_images = {}
         
         # Modern stil oluştur
         self.setup_styles()
 
         self.create_database()
+
+        # Veritabanı ve dosya işlemleri arka planda çalışır; sonuçlar ana thread'e aktarılır
+        self.tasks = desktop_tasks.TaskRunner(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.setup_ui()
 
+    def on_close(self):
+        self.tasks.shutdown()
+        self.root.destroy()
+
     def load_icons(self):
         """İkon resimlerini yükler"""
         try:
@@ -136,7 +159,7 @@ class InventoryApp:
                              font=('Arial', 10, 'bold'))
 
     def create_database(self):
-        self.conn = sqlite3.connect("database.db")
+        self.conn = inventory_db.connect(DATABASE)
         self.cursor = self.conn.cursor()
         
         # Kontrol et - "id" sütunu var mı?
@@ -146,19 +169,7 @@ class InventoryApp:
         
         # Eğer tablo yoksa oluştur
         if not columns:
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS inventory (
-                    id INTEGER,
-                    item_number TEXT PRIMARY KEY,
-                    title TEXT,
-                    variation_details TEXT,
-                    available_quantity INTEGER,
-                    currency TEXT,
-                    start_price REAL,
-                    depot_info TEXT,
-                    image_path TEXT
-                )
-            ''')
+            inventory_db.create_inventory_table(self.conn)
             print("Tablo oluşturuldu")
         # Eğer tablo var ama id sütunu yoksa ekle
         elif 'id' not in column_names:
@@ -177,6 +188,8 @@ class InventoryApp:
             
         self.conn.commit()
 
+        inventory_db.ensure_schema(self.conn)
+
     def setup_ui(self):
         # Ana çerçeve - tüm içeriği içerecek
         main_frame = ttk.Frame(self.root, padding=10)
@@ -242,9 +255,8 @@ class InventoryApp:
         )
         
         self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=30,
-                                 yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+                                 xscrollcommand=x_scrollbar.set)
         
-        y_scrollbar.config(command=self.tree.yview)
         x_scrollbar.config(command=self.tree.xview)
         
         for col in columns:
@@ -262,6 +274,9 @@ class InventoryApp:
             else:
                 self.tree.column(col, width=100, minwidth=80, anchor=tk.CENTER, stretch=True)
         self.tree.pack(fill=tk.BOTH, expand=True)
+
+        # Sanal liste: Treeview'da sadece görünen satırlar bulunur, dikey kaydırmayı liste yönetir
+        self.grid = virtual_tree.VirtualTreeview(self.tree, y_scrollbar, self.fetch_rows, row_height=25)
         
         # Klavye olayları için bağlayıcılar
         self.tree.bind("<Key>", self.on_key_press)
@@ -306,6 +321,13 @@ class InventoryApp:
         # Başlangıçta envanteri yükle
         self.load_inventory()
 
+    # Önizleme resim boyutu, bellekte tutulacak önizleme sayısı ve önceden hazırlanacak komşu satırlar
+    PREVIEW_SIZE = 390
+    PREVIEW_CACHE_SIZE = 24
+    PREVIEW_PREFETCH_ROWS = 3
+    # Fare bir satırda bu kadar (ms) durunca önizleme açılır - satırlar üzerinden geçerken resim açılmaz
+    PREVIEW_DELAY_MS = 80
+
     def on_mouse_move(self, event):
         """Fare hareketi olayını işler"""
         # Farenin olduğu öğeyi ve sütunu al
@@ -313,124 +335,212 @@ class InventoryApp:
         column = self.tree.identify_column(event.x)
         
         # İşlemi image sütunu için sınırla
-        if column == "#1" and item:  # #1 = "Image" sütunu
-            try:
-                # Öğenin resim yolunu al
-                image_path = self.get_image_path_for_item(item)
-                if image_path and os.path.exists(image_path):
-                    # İmlecin ekran konumunu al
-                    x, y = event.x_root, event.y_root
-                    # Resmi görüntüle
-                    self.show_image_preview(image_path, x, y)
-                    return
-            except Exception as e:
-                print(f"Resim önizleme hatası: {e}")
-        
-        # Diğer durumlar için önizleme penceresini kapat
+        row = item if column == "#1" and item else None  # #1 = "Image" sütunu
+        # Aynı satırda hareket: önizleme zaten gösteriliyor veya bekliyor
+        if row == self.preview_row:
+            return
+        self.preview_row = row
+        self._cancel_pending_preview()
+        if row is None:
+            # Diğer durumlar için önizleme penceresini kapat
+            self.hide_image_preview()
+            return
+        self.preview_after = self.root.after(self.PREVIEW_DELAY_MS, self._show_preview_for_row,
+                                             row, event.x_root, event.y_root)
+
+    def _cancel_pending_preview(self):
+        if self.preview_after is not None:
+            self.root.after_cancel(self.preview_after)
+            self.preview_after = None
+
+    def _show_preview_for_row(self, item, x, y):
+        self.preview_after = None
+        try:
+            # Öğenin resmini al - varlık bilgisi manifest'ten, dosya sistemine gidilmez
+            image = self.get_image_for_item(item)
+            if image:
+                # Resmi görüntüle, komşu satırların önizlemelerini arka planda hazırla
+                self.show_image_preview(image, x, y)
+                self.prefetch_previews(self.grid.key_of(item))
+                return
+        except Exception as e:
+            print(f"Resim önizleme hatası: {e}")
         self.hide_image_preview()
 
     def on_mouse_leave(self, event):
         """Fare pencereden ayrıldığında önizleme penceresini kapatır"""
+        self.close_image_preview()
+
+    def close_image_preview(self, event=None):
+        """Önizlemeyi kapatır; fare aynı satıra tekrar geldiğinde yeniden gösterilir"""
+        self.preview_row = None
         self.hide_image_preview()
 
-    def get_image_path_for_item(self, item_id):
-        """TreeView öğe ID'sine göre resim yolunu döndürür"""
-        item_values = self.tree.item(item_id, "values")
-        item_number = item_values[1]  # Item Number - daha güvenilir bir tanımlayıcı
-        
-        try:
-            conn = sqlite3.connect("database.db")
-            cursor = conn.cursor()
-            cursor.execute("SELECT image_path FROM inventory WHERE item_number = ?", (item_number,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result and result[0]:
-                return result[0]
+    @staticmethod
+    def _row_image(image_path, present, mtime):
+        """Önizleme önbelleği anahtarı: (resim yolu, manifest mtime); resim yoksa None"""
+        return (image_path, mtime) if image_path and present == 1 else None
+
+    def get_image_for_item(self, item_id):
+        """TreeView öğe ID'sine göre (resim yolu, mtime) döndürür (satır okunurken kaydedilen haritadan)"""
+        key = self.grid.key_of(item_id)
+        if key is None:
             return None
+        if key in self.row_images:
+            return self.row_images[key]
+
+        # Haritada yoksa rowid ile bir kez sorgula
+        try:
+            conn = inventory_db.connect(DATABASE)
+            try:
+                result = conn.execute("""
+                    SELECT inventory.image_path, image_manifest.present, image_manifest.mtime
+                    FROM inventory
+                    LEFT JOIN image_manifest ON image_manifest.image_path = inventory.image_path
+                    WHERE inventory.rowid = ?
+                """, (key,)).fetchone()
+            finally:
+                conn.close()
+            self.row_images[key] = self._row_image(*result) if result else None
+            return self.row_images[key]
         except Exception as e:
             print(f"Resim yolu sorgulama hatası: {e}")
             return None
 
-    def show_image_preview(self, image_path, x, y):
-        """Resmin önizlemesini gösterir"""
-        try:
-            # Eğer önizleme penceresi zaten açıksa, kapat
-            if self.preview_window and self.preview_window.winfo_exists():
-                self.preview_window.destroy()
-            
-            # Yeni önizleme penceresi oluştur
-            self.preview_window = tk.Toplevel(self.root)
-            self.preview_window.overrideredirect(True)  # Başlık çubuğunu kaldır
-            self.preview_window.wm_attributes("-topmost", True)  # Her zaman üstte
-            
-            # Önizleme boyutu
-            preview_width = 400
-            preview_height = 400
-            
-            # Ekran boyutlarını al
-            screen_width = self.root.winfo_screenwidth()
-            screen_height = self.root.winfo_screenheight()
-            
-            # Ekranın ortasında konumlandır
-            x_position = (screen_width - preview_width) // 2
-            y_position = (screen_height - preview_height) // 2
-            
-            # Pencereyi ekranın ortasına konumlandır
-            self.preview_window.geometry(f"{preview_width}x{preview_height}+{x_position}+{y_position}")
-            
-            # Kenarlık ekle - daha belirgin olması için
-            frame = ttk.Frame(self.preview_window, relief='solid', borderwidth=2)
-            frame.pack(fill="both", expand=True, padx=2, pady=2)
-            
-            # Resmi yükle ve göster
-            img = Image.open(image_path)
+    def decode_preview(self, image_path):
+        """Resmi açar, döndürür ve önizleme boyutuna küçültür (Tk kullanmaz - arka planda çağrılabilir)"""
+        with Image.open(image_path) as img:
             img = self.fix_image_rotation(img)
-            img = img.resize((preview_width-10, preview_height-10), Image.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            
-            # Resmi içerecek etiket
-            label = Label(frame, image=photo, bg="white")
-            label.image = photo  # Referansı tut
-            label.pack(fill="both", expand=True)
-            
-            # Kapatma butonu ekle
-            close_btn = ttk.Button(frame, text="Kapat", command=self.hide_image_preview)
-            close_btn.pack(side="bottom", pady=5)
-            
-            # Escape tuşu ile kapatma
-            self.preview_window.bind("<Escape>", lambda e: self.hide_image_preview())
-            # Tıklama ile kapatma 
-            self.preview_window.bind("<Button-1>", lambda e: self.hide_image_preview())
-            
+            return img.resize((self.PREVIEW_SIZE, self.PREVIEW_SIZE), Image.LANCZOS)
+
+    def _cache_preview(self, cache_key, photo):
+        self.preview_cache[cache_key] = photo
+        self.preview_cache.move_to_end(cache_key)
+        while len(self.preview_cache) > self.PREVIEW_CACHE_SIZE:
+            self.preview_cache.popitem(last=False)
+
+    def get_preview_photo(self, cache_key):
+        """Önizleme PhotoImage'ını önbellekten verir; yoksa oluşturup önbelleğe ekler
+
+        cache_key (resim yolu, manifest mtime) - resim aynı yola yeniden yazılırsa manifest'teki
+        mtime değişir, eski önizleme kullanılmaz.
+        """
+        photo = self.preview_cache.get(cache_key)
+        if photo is None:
+            photo = ImageTk.PhotoImage(self.decode_preview(cache_key[0]))
+            self._cache_preview(cache_key, photo)
+        else:
+            self.preview_cache.move_to_end(cache_key)
+        return photo
+
+    def prefetch_previews(self, key):
+        """Satırın üstündeki ve altındaki birkaç satırın önizlemelerini arka planda hazırlar"""
+        index = self.grid.index_of(key) if key is not None else None
+        if index is None:
+            return
+        rows = self.PREVIEW_PREFETCH_ROWS
+        neighbours = self.grid.keys[max(0, index - rows):index + rows + 1]
+        images = list(dict.fromkeys(self.row_images.get(k) for k in neighbours if k != key))
+        images = [image for image in images if image and image not in self.preview_cache]
+        if not images:
+            return
+
+        def worker(task):
+            for cache_key in images:
+                task.check()
+                try:
+                    image = self.decode_preview(cache_key[0])
+                except Exception:
+                    continue  # Eksik veya bozuk resim - üzerine gelindiğinde hata orada gösterilir
+                task.post((cache_key, image))
+
+        def on_chunk(item):
+            # PhotoImage sadece ana thread'de oluşturulur
+            cache_key, image = item
+            if cache_key not in self.preview_cache:
+                self._cache_preview(cache_key, ImageTk.PhotoImage(image))
+
+        # Yeni satıra geçilince önceki satırın komşuları artık gerekmez
+        self.tasks.submit(worker, name="preview-prefetch", key="preview", on_chunk=on_chunk)
+
+    def _create_preview_window(self):
+        self.preview_window = tk.Toplevel(self.root)
+        self.preview_window.withdraw()
+        self.preview_window.overrideredirect(True)  # Başlık çubuğunu kaldır
+        self.preview_window.wm_attributes("-topmost", True)  # Her zaman üstte
+        
+        # Önizleme boyutu
+        preview_width = self.PREVIEW_SIZE + 10
+        preview_height = self.PREVIEW_SIZE + 10
+        
+        # Ekran boyutlarını al
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        
+        # Ekranın ortasında konumlandır
+        x_position = (screen_width - preview_width) // 2
+        y_position = (screen_height - preview_height) // 2
+        
+        # Pencereyi ekranın ortasına konumlandır
+        self.preview_window.geometry(f"{preview_width}x{preview_height}+{x_position}+{y_position}")
+        
+        # Kenarlık ekle - daha belirgin olması için
+        frame = ttk.Frame(self.preview_window, relief='solid', borderwidth=2)
+        frame.pack(fill="both", expand=True, padx=2, pady=2)
+        
+        # Resmi içerecek etiket
+        self.preview_label = Label(frame, bg="white")
+        self.preview_label.image = None
+        self.preview_label.pack(fill="both", expand=True)
+        
+        # Kapatma butonu ekle
+        close_btn = ttk.Button(frame, text="Kapat", command=self.close_image_preview)
+        close_btn.pack(side="bottom", pady=5)
+        
+        # Escape tuşu ile kapatma
+        self.preview_window.bind("<Escape>", self.close_image_preview)
+        # Tıklama ile kapatma 
+        self.preview_window.bind("<Button-1>", self.close_image_preview)
+
+    def show_image_preview(self, image, x, y):
+        """Resmin önizlemesini gösterir - image: (resim yolu, manifest mtime)"""
+        try:
+            photo = self.get_preview_photo(image)
+            if self.preview_window is None or not self.preview_window.winfo_exists():
+                self._create_preview_window()
+            # Aynı resim zaten gösteriliyorsa etiket değiştirilmez
+            if self.preview_label.image is not photo:
+                self.preview_label.configure(image=photo)
+                self.preview_label.image = photo  # Referansı tut
+            self.preview_window.deiconify()
+            self.preview_window.lift()
         except Exception as e:
             print(f"Önizleme penceresi oluşturma hatası: {e}")
-            if self.preview_window and self.preview_window.winfo_exists():
-                self.preview_window.destroy()
-                self.preview_window = None
+            self.hide_image_preview()
 
     def hide_image_preview(self):
-        """Resim önizleme penceresini kapatır"""
+        """Resim önizleme penceresini gizler (pencere sonraki önizleme için saklanır)"""
+        self._cancel_pending_preview()
         if self.preview_window and self.preview_window.winfo_exists():
-            self.preview_window.destroy()
-            self.preview_window = None
+            self.preview_window.withdraw()
 
     def on_double_click(self, event):
         """Çift tıklama gerçekleştiğinde edit_item metodunu çağırır"""
         self.edit_item()
 
     def print_selected_item(self):
-        """Seçili öğe için print penceresi açar"""
-        selected_item = self.tree.focus()
-        if not selected_item:
+        """Seçili öğe(ler) için print penceresi açar"""
+        selected_items = self.tree.selection() or ((self.tree.focus(),) if self.tree.focus() else ())
+        if not selected_items:
             messagebox.showwarning("Selection Error", "Please select an item to print.")
             return
         
-        item_values = self.tree.item(selected_item, "values")
-        if not item_values:
+        items = [self.tree.item(selected_item, "values") for selected_item in selected_items]
+        items = [item_values for item_values in items if item_values]
+        if not items:
             return
             
-        self.open_print_options(item_values)
+        self.open_print_options(items)
 
     def create_thumbnail(self, image_path, item_number, force_recreate=False):
         """
@@ -474,95 +584,117 @@ class InventoryApp:
             print(f"Thumbnail oluşturma hatası: {e}")
             return None
 
+    # Arka planda okunan satır sırası ana thread'e bu büyüklükte parçalarla aktarılır
+    KEY_CHUNK = 5000
+
     def load_inventory(self):
-        try:
-            # İkon sözlüğünü temizle
-            self.tree_icons.clear()
-            
-            start_time = time.time()  # Yükleme süresini ölçmek için
-            
-            conn = sqlite3.connect("database.db")
-            
-            # ID değerlerini düzelt - önce mevcut ID'leri kontrol et
-            cursor = conn.cursor()
-            cursor.execute("SELECT rowid, id FROM inventory")
-            rows = cursor.fetchall()
-            
-            # NaN veya hatalı ID'leri düzelt
-            for row in rows:
-                rowid, id_val = row
-                # ID boş, NaN veya geçersiz mi?
-                fix_needed = False
-                
-                if id_val is None:
-                    fix_needed = True
-                else:
-                    try:
-                        # Ondalıklı sayı kontrolü
-                        float_id = float(id_val)
-                        if float_id != int(float_id):  # '304.0' gibi ondalıklı bir değer
-                            fix_needed = True
-                            id_val = int(float_id)
-                    except (ValueError, TypeError):
-                        fix_needed = True
-                        id_val = rowid  # rowid'yi ID olarak kullan
-                
-                # ID'yi düzeltmek gerekiyorsa
-                if fix_needed:
-                    try:
-                        cursor.execute("UPDATE inventory SET id = ? WHERE rowid = ?", (rowid, rowid))
-                        print(f"ID düzeltildi: rowid={rowid}, yeni id={rowid}")
-                    except Exception as e:
-                        print(f"ID düzeltme hatası: {e}")
-            
-            conn.commit()
-            
-            # Sorguyu güncelle, id sütununu kullan
-            df = pd.read_sql_query("SELECT id as ID, item_number, title, variation_details, available_quantity, currency, start_price, depot_info, image_path FROM inventory ORDER BY id DESC", conn)
-            conn.close()
+        # İkon sözlüğünü temizle
+        self.tree_icons.clear()
+        start_time = time.time()  # Yükleme süresini ölçmek için
+        state = {"first": True}
 
-            # TreeView'i temizle
-            for row in self.tree.get_children():
-                self.tree.delete(row)
+        def worker(task):
+            conn = inventory_db.connect(DATABASE)
+            try:
+                # Manifest'te olmayan resimleri bir kez kontrol et, gerisi manifest'ten okunur
+                inventory_db.record_unknown_images(conn, self.upload_folder)
+                task.check()
+                # Sadece satır sırası okunur; satır değerleri kaydırıldıkça fetch_rows ile gelir
+                cursor = conn.execute("SELECT rowid FROM inventory ORDER BY id DESC")
+                while True:
+                    rows = cursor.fetchmany(self.KEY_CHUNK)
+                    if not rows:
+                        break
+                    task.post([row[0] for row in rows])
+            finally:
+                conn.close()
 
-            # Verileri TreeView'e ekle
-            for idx, row in df.iterrows():
-                values = list(row)
-                # ID değerini düzgün formatla
-                try:
-                    if pd.isna(values[0]):
-                        values[0] = idx + 1
-                    else:
-                        values[0] = int(float(values[0]))
-                except (ValueError, TypeError):
-                    values[0] = idx + 1
-                # Formatlamalar
-                values[5] = str(values[5])  # Currency
-                try:
-                    values[6] = f"{float(values[6]):.2f}"  # Start price
-                except ValueError:
-                    values[6] = str(values[6])
-                # Resim ikonu için emoji kullan
-                image_path = values[8]  # image_path
-                image_icon = "📷" if image_path and os.path.exists(image_path) else ""
-                item_values = values[:8] + [image_icon]  # Image sütunu en sağda
-                self.tree.insert("", "end", values=item_values)
+        def on_chunk(keys):
+            # İlk parça listeyi değiştirir (ilk ekran hemen görünür), sonrakiler sona eklenir
+            if state["first"]:
+                state["first"] = False
+                self.row_images.clear()
+                self.grid.set_keys(keys)
+            else:
+                self.grid.append_keys(keys)
 
+        def on_done(result):
+            if state["first"]:
+                self.grid.set_keys([])
             self.calculate_total_value()
-            
-            end_time = time.time()
-            print(f"Envanter yükleme süresi: {end_time - start_time:.2f} saniye")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load inventory: {e}")
-            print(f"Load inventory error: {e}")
+            print(f"Envanter yükleme süresi: {time.time() - start_time:.2f} saniye")
+
+        def on_error(error):
+            messagebox.showerror("Error", f"Failed to load inventory: {error}")
+
+        # Yeni yükleme veya arama, bitmemiş öncekini iptal eder
+        self.tasks.submit(worker, name="load-inventory", key="grid",
+                          on_chunk=on_chunk, on_done=on_done, on_error=on_error)
+
+    # Sanal liste için satır sorgusu - anahtar rowid'dir (id INTEGER PRIMARY KEY olduğundan id ile aynı)
+    ROW_QUERY = """
+        SELECT inventory.rowid, inventory.id, item_number, title, variation_details, available_quantity, currency,
+               start_price, depot_info, inventory.image_path, image_manifest.present, image_manifest.mtime
+        FROM inventory
+        LEFT JOIN image_manifest ON image_manifest.image_path = inventory.image_path
+    """
+
+    @staticmethod
+    def format_row(row):
+        """Veritabanı satırını TreeView değerlerine çevirir: rowid, id, ..., image_path, resim var mı"""
+        rowid, id_val = row[0], row[1]
+        values = list(row[1:])
+        # ID değerini düzgün formatla
+        try:
+            values[0] = int(float(id_val)) if id_val is not None else rowid
+        except (ValueError, TypeError):
+            values[0] = rowid
+        # Formatlamalar
+        values[5] = str(values[5])  # Currency
+        try:
+            values[6] = f"{float(values[6]):.2f}"  # Start price
+        except (ValueError, TypeError):
+            values[6] = str(values[6])
+        # Resim ikonu için emoji kullan - varlık bilgisi manifest'ten
+        image_path = values[8]
+        image_icon = "📷" if image_path and values[9] == 1 else ""
+        return values[:8] + [image_icon]  # Image sütunu en sağda
+
+    def fetch_rows(self, keys):
+        """Sanal listenin istediği satırları (rowid listesi) okur ve biçimlendirir"""
+        rows = {}
+        conn = inventory_db.connect(DATABASE)
+        try:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(f"{self.ROW_QUERY} WHERE inventory.rowid IN ({placeholders})", chunk):
+                    rows[row[0]] = self.format_row(row)
+                    self.row_images[row[0]] = self._row_image(row[9], row[10], row[11])
+        finally:
+            conn.close()
+        return rows
+
+    def apply_changes(self, updated=(), inserted=(), removed=()):
+        """Tek satırlık değişikliklerden sonra tüm tabloyu yeniden yüklemek yerine sadece
+        etkilenen satırları (rowid) günceller, ekler veya kaldırır ve toplam değeri yeniler"""
+        changed = self.fetch_rows(list(updated) + list(inserted)) if updated or inserted else {}
+        if removed:
+            self.grid.remove_rows(removed)
+            for key in removed:
+                self.row_images.pop(key, None)
+        if updated:
+            self.grid.update_rows({key: changed[key] for key in updated if key in changed})
+        if inserted:
+            # Liste id'ye göre azalan sırada - yeni kayıtlar en üste eklenir
+            self.grid.insert_rows(list(inserted), changed, index=0)
+        self.calculate_total_value()
 
     def calculate_total_value(self):
         try:
-            conn = sqlite3.connect("database.db")
-            cursor = conn.cursor()
-            cursor.execute("SELECT SUM(CASE WHEN typeof(start_price) = 'text' THEN 0 ELSE available_quantity * start_price END) FROM inventory")
-            total_value = cursor.fetchone()[0] or 0
+            conn = inventory_db.connect(DATABASE)
+            # Trigger'larla güncellenen sayaç tablosundan oku - tablo taranmaz
+            total_value = inventory_db.get_stats(conn)["total_value"] or 0
             conn.close()
             self.total_label.config(
                 text=f"Total Inventory Value: ${total_value:.2f}" if total_value else "Total Inventory Value: $0"
@@ -571,7 +703,9 @@ class InventoryApp:
             messagebox.showerror("Error", f"Failed to calculate total inventory value: {e}")
 
     def load_excel(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")])
+        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx"),
+                                                          ("Snapshot files", "*.parquet *.arrow *.feather"),
+                                                          ("All files", "*.*")])
         if not file_path:
             return
         action = messagebox.askquestion("Load Excel",
@@ -592,35 +726,14 @@ class InventoryApp:
                 self.load_excel_to_db(file_path, append=False)
 
     def load_excel_to_db(self, file_path, append=False):
-        # Excel'den yüklemeden önce boş değerleri düzenle
-        def clean_data(value):
-            if pd.isna(value) or value == "":
-                return ""
-            return value
+        # Parquet/Arrow anlık görüntüleri Excel gibi yüklenir (tipler korunur, çok daha hızlı)
+        if inventory_export.snapshot_format(file_path):
+            self.load_snapshot_to_db(file_path, append)
+            return
 
-        try:
+        def worker(task):
             df = pd.read_excel(file_path)
-
-            # Boş değerleri temizle
-            if "variation_details" in df.columns:
-                df["variation_details"] = df["variation_details"].apply(clean_data)
-            if "depot_info" in df.columns:
-                df["depot_info"] = df["depot_info"].apply(clean_data)
-
-            # start_price değerlerini 0.00 formatına çevir
-            if "start_price" in df.columns:
-                # Güvenli dönüşüm için try-except kullan
-                def safe_float_convert(x):
-                    try:
-                        return f"{float(x):.2f}"
-                    except (ValueError, TypeError):
-                        return str(x)
-                
-                df["start_price"] = df["start_price"].map(safe_float_convert)
-                
-            # Ensure currency is a string
-            if "currency" in df.columns:
-                df["currency"] = df["currency"].astype(str)
+            task.check()
 
             df.rename(
                 columns={
@@ -642,49 +755,133 @@ class InventoryApp:
                 "start_price",
             ]
             if not all((col in df.columns for col in required_columns)):
+                return None
+            task.progress(0, len(df))
+            # Değerler sütun tiplerine çevrilerek yazılır (id tam sayı, fiyat REAL, boş hücreler "")
+            # İptal edilirse progress TaskCancelled fırlatır ve yükleme geri alınır
+            conn = inventory_db.connect(DATABASE)
+            try:
+                return inventory_export.load_records(
+                    conn, list(df.columns), list(df.itertuples(index=False, name=None)), append=append,
+                    progress=task.progress,
+                )
+            finally:
+                conn.close()
+
+        def on_done(inserted):
+            dialog.close()
+            if inserted is None:
                 messagebox.showerror("Error", "Excel file headers do not match the expected format.")
                 return
-            with sqlite3.connect("database.db") as conn:
-                if append:
-                    df.to_sql("inventory", conn, if_exists="append", index=False)
-                else:
-                    df.to_sql("inventory", conn, if_exists="replace", index=False)
             messagebox.showinfo("Success", "Data successfully loaded into the database.")
+            # Eklemede sadece yeni satırlar listeye girer; tablo değiştiyse tamamen yeniden yüklenir
+            if append:
+                self.apply_changes(inserted=sorted(inserted, reverse=True))
+            else:
+                self.load_inventory()
+
+        task = self.tasks.submit(worker, name="excel-import", on_done=on_done,
+                                 on_progress=lambda done, total: dialog.update(done, total),
+                                 on_error=lambda error: self._task_failed(dialog, f"Failed to load data: {error}"),
+                                 on_cancel=lambda: self._task_cancelled(dialog, "Excel import was cancelled."))
+        dialog = desktop_tasks.ProgressDialog(self.root, "Loading Excel", task)
+
+    def load_snapshot_to_db(self, file_path, append=False):
+        if not inventory_export.PYARROW_AVAILABLE:
+            messagebox.showerror("Error", "Failed to load data: pyarrow is not installed.")
+            return
+
+        def worker(task):
+            conn = inventory_db.connect(DATABASE)
+            try:
+                return inventory_export.load_snapshot(conn, file_path, append=append, progress=task.progress)
+            finally:
+                conn.close()
+
+        def on_done(count):
+            dialog.close()
+            messagebox.showinfo("Success", f"{count} rows successfully loaded into the database.")
             self.load_inventory()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load data: {e}")
+
+        task = self.tasks.submit(worker, name="snapshot-import", on_done=on_done,
+                                 on_progress=lambda done, total: dialog.update(done, total),
+                                 on_error=lambda error: self._task_failed(dialog, f"Failed to load data: {error}"),
+                                 on_cancel=lambda: self._task_cancelled(dialog, "Snapshot import was cancelled."))
+        dialog = desktop_tasks.ProgressDialog(self.root, "Loading snapshot", task)
+
+    def _task_failed(self, dialog, message):
+        dialog.close()
+        messagebox.showerror("Error", message)
+
+    def _task_cancelled(self, dialog, message):
+        dialog.close()
+        messagebox.showinfo("Cancelled", message)
 
     def export_to_excel(self):
         file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
         if not file_path:
             return
-        conn = sqlite3.connect("database.db")
-        df = pd.read_sql_query("SELECT * FROM inventory", conn)
+        if not inventory_export.OPENPYXL_AVAILABLE:
+            messagebox.showerror("Error", "Failed to export data: openpyxl is not installed.")
+            return
+
+        conn = inventory_db.connect(DATABASE)
+        total_rows = inventory_db.get_stats(conn)["total_rows"]
         conn.close()
 
-        # start_price sütununu 0.00 formatına çevir
-        df["item_number"] = df["item_number"].astype(str)
-        # Güvenli dönüşüm için try-except kullan
-        def safe_float_convert(x):
+        def produce_rows():
+            conn = inventory_db.connect(DATABASE)
             try:
-                return f"{float(x):.2f}"
-            except (ValueError, TypeError):
-                return str(x)
-        
-        df["start_price"] = df["start_price"].map(safe_float_convert)
-        df["currency"] = df["currency"].astype(str)  # Ensure currency is a string
+                # Önceki sürümlerin Excel dosyalarıyla aynı sütunlar (updated_at, change_seq hariç)
+                columns = list(inventory_export.EXPORT_COLUMNS)
+                select = ", ".join(f'"{column}"' for column in columns)
+                cursor = conn.execute(f"SELECT {select} FROM inventory")
+                yield columns
+                item_number_index = columns.index("item_number") if "item_number" in columns else None
+                price_index = columns.index("start_price") if "start_price" in columns else None
+                currency_index = columns.index("currency") if "currency" in columns else None
+                for row in inventory_export.iter_rows(cursor):
+                    row = list(row)
+                    # item_number ve currency metin, start_price 0.00 formatında
+                    if item_number_index is not None:
+                        row[item_number_index] = str(row[item_number_index])
+                    if price_index is not None:
+                        row[price_index] = self._format_price(row[price_index])
+                    if currency_index is not None:
+                        row[currency_index] = str(row[currency_index])
+                    yield row
+            finally:
+                conn.close()
 
+        # Dışa aktarma arka planda çalışır, arayüz donmaz
+        def worker(task):
+            rows = produce_rows()
+            header = next(rows)
+            inventory_export.write_xlsx(file_path, header, rows, sheet_name="Sheet1",
+                                        progress=task.progress, cancel_event=task.cancel_event)
 
-        try:
-            df.to_excel(file_path, index=False)
+        def on_done(result):
+            dialog.close()
             messagebox.showinfo("Success", "Data successfully exported to Excel.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export data: {e}")
+
+        task = self.tasks.submit(worker, name="excel-export", on_done=on_done,
+                                 on_progress=lambda done, total: dialog.update(done),
+                                 on_error=lambda error: self._task_failed(dialog, f"Failed to export data: {error}"),
+                                 on_cancel=lambda: self._task_cancelled(dialog, "Excel export was cancelled."))
+        dialog = desktop_tasks.ProgressDialog(self.root, "Exporting to Excel", task, total=total_rows)
+
+    @staticmethod
+    def _format_price(value):
+        """start_price değerini 0.00 formatına çevirir, sayı değilse olduğu gibi bırakır"""
+        try:
+            return f"{float(value):.2f}"
+        except (ValueError, TypeError):
+            return str(value)
 
     def get_next_id(self):
         """Bir sonraki ID numarasını döndürür"""
         try:
-            conn = sqlite3.connect("database.db")
+            conn = inventory_db.connect(DATABASE)
             cursor = conn.cursor()
             
             # Mevcut en yüksek ID'yi bul
@@ -692,32 +889,9 @@ class InventoryApp:
             result = cursor.fetchone()[0]
             conn.close()
             
+            # id INTEGER PRIMARY KEY - değerler her zaman tam sayıdır (şema geçişi 1)
             if result is not None:
-                # Ondalıklı değer olabilir, önce float'a çevirip sonra int'e çevirelim
-                try:
-                    # None olmayan ama '304.0' gibi ondalıklı gözüken bir string olabilir
-                    if isinstance(result, str):
-                        result = float(result)
-                    # Float ise int'e çevir
-                    next_id = int(float(result)) + 1
-                    print(f"Mevcut max ID: {result}, sonraki ID: {next_id}")
-                    return next_id
-                except (ValueError, TypeError) as e:
-                    print(f"ID dönüşüm hatası: {e}, ID: {result}")
-                    # Hata durumunda veritabanını tarayarak en yüksek ID'yi bulmaya çalışalım
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT id FROM inventory")
-                    all_ids = cursor.fetchall()
-                    max_id = 0
-                    for id_val in all_ids:
-                        if id_val[0] is not None:
-                            try:
-                                id_int = int(float(id_val[0]))
-                                if id_int > max_id:
-                                    max_id = id_int
-                            except (ValueError, TypeError):
-                                pass
-                    return max_id + 1
+                return int(result) + 1
             
             # Hiç ID yoksa veya hepsi None ise 1'den başla
             return 1
@@ -893,7 +1067,7 @@ class InventoryApp:
                             return
                     
                     # Veritabanına kaydet (ID dahil) - ID değerinin kesinlikle integer olduğundan emin ol
-                    conn = sqlite3.connect("database.db")
+                    conn = inventory_db.connect(DATABASE)
                     cursor = conn.cursor()
                     
                     # next_id'nin integer olduğundan emin ol
@@ -916,11 +1090,13 @@ class InventoryApp:
                             image_path,
                         ),
                     )
+                    new_rowid = cursor.lastrowid
+                    inventory_db.record_image(conn, image_path)
                     conn.commit()
                     conn.close()
                     messagebox.showinfo("Success", "New item added successfully.")
                     add_window.destroy()
-                    self.load_inventory()
+                    self.apply_changes(inserted=[new_rowid])
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to add item: {e}")
                     print(f"Ürün ekleme hatası: {e}")
@@ -984,7 +1160,7 @@ class InventoryApp:
         
         # Mevcut resim yolunu al - item_number ile sorgula (daha güvenilir)
         try:
-            conn = sqlite3.connect("database.db")
+            conn = inventory_db.connect(DATABASE)
             cursor = conn.cursor()
             cursor.execute("SELECT image_path FROM inventory WHERE item_number = ?", (item_number,))
             result = cursor.fetchone()
@@ -1107,9 +1283,13 @@ class InventoryApp:
                 new_depot = depot_entry.get()
                 
                 # Veritabanını güncelle
-                conn = sqlite3.connect("database.db")
+                conn = inventory_db.connect(DATABASE)
                 cursor = conn.cursor()
                 
+                # Güncellenecek satırlar (aynı ürün numarası birden fazla satırda olabilir)
+                updated = [row[0] for row in cursor.execute(
+                    "SELECT rowid FROM inventory WHERE item_number = ?", (item_number,)
+                )]
                 # Resim yolunu da güncelleyerek
                 cursor.execute(
                     '''
@@ -1124,7 +1304,7 @@ class InventoryApp:
                 conn.close()
                 messagebox.showinfo("Success", "Item updated successfully.")
                 edit_window.destroy()
-                self.load_inventory()
+                self.apply_changes(updated=updated)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to update item: {e}")
 
@@ -1140,140 +1320,108 @@ class InventoryApp:
         if not search_term:
             messagebox.showwarning("Input Error", "Please enter a search term.")
             return
-        try:
-            # İkon sözlüğünü temizle
-            self.tree_icons.clear()
-            
-            conn = sqlite3.connect("database.db")
-            cursor = conn.cursor()
-            # Item number, title ve variation_details alanlarında arama yap
-            cursor.execute("""
-                SELECT rowid as ID, item_number, title, variation_details, available_quantity, currency, start_price, depot_info, image_path 
-                FROM inventory 
-                WHERE item_number LIKE ? OR title LIKE ? OR variation_details LIKE ?
-                ORDER BY CAST(item_number AS INTEGER) DESC
-            """, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            if not results:
+        # İkon sözlüğünü temizle
+        self.tree_icons.clear()
+
+        def worker(task):
+            conn = inventory_db.connect(DATABASE)
+            try:
+                # Item number, title ve variation_details alanlarında FTS indeksiyle arama yap
+                sql_query, params = inventory_db.ranked_search_query(
+                    conn, search_term,
+                    "inventory.rowid, inventory.id, item_number, title, variation_details, available_quantity, currency, start_price, depot_info, image_path, "
+                    "(SELECT mtime FROM image_manifest WHERE image_manifest.image_path = inventory.image_path) AS image_mtime"
+                )
+                results = conn.execute(sql_query, params).fetchall()
+                task.check()
+                # Resimlerin varlığını manifest'ten toplu oku
+                image_paths = inventory_db.image_presence(conn, [result[9] for result in results], self.upload_folder)
+            finally:
+                conn.close()
+            # Satırlar da arka planda biçimlendirilir - değerler zaten okundu, tekrar sorgulanmaz
+            values = {}
+            images = {}
+            for result in results:
+                image_path = result[9]
+                present = 1 if image_path and image_paths.get(image_path) == image_path else 0
+                values[result[0]] = self.format_row(tuple(result[:10]) + (present,))
+                images[result[0]] = self._row_image(image_path, present, result[10])
+            return [result[0] for result in results], values, images
+
+        def on_done(result):
+            keys, values, images = result
+            if not keys:
                 messagebox.showinfo("No Results", "No items found matching your search term.")
                 return
-                
-            # TreeView'i temizle
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-                
-            # Bulunan sonuçları göster
-            for idx, result in enumerate(results):
-                values = list(result)
-                
-                # Formatlamaları yap
-                values[5] = str(values[5])  # Currency sütununu string'e dönüştür
-                
-                # start_price için güvenli dönüşüm
-                try:
-                    values[6] = f"{float(values[6]):.2f}"  # Start price sütununu formatla
-                except ValueError:
-                    values[6] = str(values[6])  # Dönüşüm başarısız olursa string olarak bırak
-                
-                # Resim varsa gerçek ikon oluştur, yoksa boş ikon
-                image_path = values[8]  # image_path son sütunda
-                item_number = values[1]  # item_number değerini al
-                icon = None
-                
-                if image_path and os.path.exists(image_path):
-                    # Thumbnail kullan
-                    thumbnail_path = self.create_thumbnail(image_path, item_number)
-                    
-                    if thumbnail_path and os.path.exists(thumbnail_path):
-                        try:
-                            # Thumbnail'i yükle
-                            img = Image.open(thumbnail_path)
-                            img = self.fix_image_rotation(img)
-                            img = img.resize((300, 300), Image.LANCZOS)
-                            photo = ImageTk.PhotoImage(img)
-                            
-                            # İkonu sözlükte sakla
-                            self.tree_icons[item_number] = photo
-                            
-                            print(f"Arama sonucu thumbnail kullanıldı: {item_number}")
-                        except Exception as e:
-                            print(f"Thumbnail yükleme hatası: {e}")
-                            icon = self.no_image_icon
-                    else:
-                        icon = self.no_image_icon
-                else:
-                    icon = self.no_image_icon
-                
-                # İlk 8 değeri al (image_path hariç)
-                item_values = values[:8]
-                
-                # Öğeyi TreeView'e ekle - item_number ile
-                item_id = self.tree.insert("", "end", iid=str(item_number), image=icon, values=item_values)
-                
-            messagebox.showinfo("Search Results", f"Found {len(results)} matching items.")
-            
-        except Exception as e:
-            messagebox.showerror("Search Error", str(e))
-            print(f"Search error: {e}")
+            # Bulunan sonuçlar sıralamasıyla sanal listeye
+            self.row_images = images
+            self.grid.set_keys(keys, values)
+            messagebox.showinfo("Search Results", f"Found {len(keys)} matching items.")
+
+        def on_error(error):
+            messagebox.showerror("Search Error", str(error))
+
+        self.tasks.submit(worker, name="search", key="grid", on_done=on_done, on_error=on_error)
 
     def update_depot(self):
         selected_item = self.tree.focus()
         if not selected_item:
             messagebox.showwarning("Selection Error", "Please select an item to update depot info.")
             return
-        item_id = int(self.tree.item(selected_item, "values")[0])
+        # Sanal listenin anahtarı satırın rowid'sidir
+        rowid = self.grid.key_of(selected_item)
         depot_info = self.depot_entry.get()
         if not depot_info:
             messagebox.showwarning("Input Error", "Please enter depot information.")
             return
         try:
-            conn = sqlite3.connect("database.db")
+            conn = inventory_db.connect(DATABASE)
             cursor = conn.cursor()
             cursor.execute(
-                "UPDATE inventory SET depot_info = ? WHERE rowid = ?", (depot_info, item_id)
+                "UPDATE inventory SET depot_info = ? WHERE rowid = ?", (depot_info, rowid)
             )
             conn.commit()
             conn.close()
             messagebox.showinfo("Success", "Depot information updated successfully.")
             self.depot_entry.delete(0, tk.END)
-            self.load_inventory()
+            self.apply_changes(updated=[rowid])
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update depot information: {e}")
 
     def remove_zero_quantity_items(self):
         try:
-            conn = sqlite3.connect("database.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM inventory WHERE available_quantity = 0")
-            conn.commit()
+            conn = inventory_db.connect(DATABASE)
+            with conn:
+                removed = [row[0] for row in conn.execute("SELECT rowid FROM inventory WHERE available_quantity = 0")]
+                conn.execute("DELETE FROM inventory WHERE available_quantity = 0")
             conn.close()
             messagebox.showinfo("Success", "Items with zero quantity removed successfully.")
-            self.load_inventory()
+            self.apply_changes(removed=removed)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to remove zero quantity items: {e}")
 
-    def open_print_options(self, item_values):
+    def open_print_options(self, items):
         # Yeni bir pencere aç
         print_window = Toplevel(self.root)
         print_window.title("Print Options")
 
-        Label(print_window, text="Select a printing option:").pack(pady=10)
+        Label(print_window, text=f"Select a printing option ({len(items)} item(s)):").pack(pady=10)
 
         # 1. Seçenek: Ürün adedi kadar bas
         def print_quantity():
-            quantity = int(item_values[4])  # Available quantity
-            for _ in range(quantity):
-                self.print_label(item_values)
+            try:
+                entries = [(item_values, int(item_values[4])) for item_values in items]  # Available quantity
+            except (ValueError, IndexError):
+                messagebox.showerror("Error", "Invalid quantity value.")
+                return
+            self.print_labels([(item_values, copies) for item_values, copies in entries if copies > 0])
             print_window.destroy()
 
         Button(print_window, text="Print Quantity", command=print_quantity).pack(pady=5)
 
         # 2. Seçenek: 1 adet bas
         def print_one():
-            self.print_label(item_values)
+            self.print_labels([(item_values, 1) for item_values in items])
             print_window.destroy()
 
         Button(print_window, text="Print One Label", command=print_one).pack(pady=5)
@@ -1283,8 +1431,7 @@ class InventoryApp:
             try:
                 quantity = int(manual_entry.get())
                 if 1 <= quantity <= 99:  # Maksimum 99 sınırı
-                    for _ in range(quantity):
-                        self.print_label(item_values)
+                    self.print_labels([(item_values, quantity) for item_values in items])
                     print_window.destroy()
                 else:
                     messagebox.showerror("Error", "Please enter a number between 1 and 99.")
@@ -1298,73 +1445,34 @@ class InventoryApp:
         Button(print_window, text="Print Manual Quantity", command=manual_print).pack(pady=5)
 
     def print_label(self, item_values):
-        # Etiket boyutu (40 mm x 15 mm)
-        label_width = 113  # 40 mm
-        label_height = 80  # 15 mm
+        self.print_labels([(item_values, 1)])
+
+    def print_labels(self, entries):
+        """(TreeView satırı, adet) listesi için tek, çok sayfalı etiket PDF'i oluşturur
 
+        Her farklı etiket bir kez çizilir, kopyalar aynı içeriği tekrar kullanır.
+        """
         # Etiket verileri - Düzeltilmiş indeksler (Image sütunu artık values'ta değil)
-        if len(item_values) >= 8:
-            item_number = item_values[1]       # Item Number
-            title = item_values[2]             # Title
-            variation_details = item_values[3] # Variation Details
-            available_quantity = item_values[4] # Available Quantity
-            currency = item_values[5]          # Currency
-            start_price = item_values[6]       # Start Price
-            depot_info = item_values[7]        # Depot Info
-        else:
+        if not entries:
+            return
+        if any(len(item_values) < 8 for item_values, _ in entries):
             messagebox.showerror("Error", "Not enough data to print label")
             return
 
-        # QR kod oluşturma
-        qr = qrcode.QRCode(box_size=2, border=1)  # Küçük boyutlu QR kod
-        qr.add_data(
-            f"Item: {item_number}, Title: {title}, Variation: {variation_details}, Quantity: {available_quantity}, Price: {start_price} {currency}, Depot: {depot_info}")
-        qr_img = qr.make_image(fill="black", back_color="white")
-        qr_path = f"{item_number}_qr.png"
-        qr_img.save(qr_path)
-
-        # Etiket yazdırma
-        output_file = f"{item_number}_label.pdf"
-        c = canvas.Canvas(output_file, pagesize=(label_width, label_height))
-
-        # 1D Barkod (Item Number)
-        barcode = code128.Code128(item_number, barHeight=8, barWidth=0.6)  # Küçük boyutlu barkod
-        barcode_width = barcode.width
-        barcode_x = -12  # Barkodu sola hizala, soldan 5 birim boşluk
-        barcode.drawOn(c, barcode_x, label_height - 9)  # Barkod pozisyonu
-        c.setFont("Helvetica", 3)
-        # Item Number (Barkodun tam altına ortalanmış)
-        text_x_position = barcode_x + (barcode_width / 2) - (len(item_number) + len(depot_info) * 1 * 1)  # Ortala
-        c.drawString(text_x_position, label_height - 12, f"{item_number} -- {depot_info}")
-
-        # Title (Satırlara bölerek sığdır)
-        y_position = label_height - 20
-        c.setFont("Helvetica", 5)
-        title_lines = []
-        while len(title) > 20:  # Her satırda 20 karakter
-            title_lines.append(title[:20])
-            title = title[20:]
-        title_lines.append(title)
-        for line in title_lines:
-            c.drawString(5, y_position, line)
-            y_position -= 10
-
-        # Variation Details
-        if variation_details:
-            c.drawString(5, y_position, variation_details)
-            y_position -= 10
-
-        # Price + Currency
-        c.setFont("Helvetica", 6)
-        c.drawString(15, y_position, f"{start_price} {currency}")
-
-        # QR Kod (sağda yer alacak)
-        c.drawImage(qr_path, label_width - 48, 3, width=45, height=45)
-
-        c.save()
-
-        os.remove(qr_path)  # QR kod geçici dosyasını sil
-        print(f"Etiket oluşturuldu: {output_file}")
+        try:
+            pdf = label_engine.render_desktop_labels(entries)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create labels: {e}")
+            return
+
+        item_numbers = {item_values[1] for item_values, _ in entries}
+        if len(item_numbers) == 1:
+            output_file = f"{item_numbers.pop()}_label.pdf"
+        else:
+            output_file = f"labels_{time.strftime('%Y%m%d_%H%M%S')}.pdf"
+        with open(output_file, "wb") as f:
+            f.write(pdf)
+        print(f"Etiket oluşturuldu: {output_file} ({sum(copies for _, copies in entries)} sayfa)")
 
     def on_key_press(self, event):
         """Herhangi bir tuşa basıldığında çağrılır"""
@@ -1373,20 +1481,20 @@ class InventoryApp:
             self.center_selected_item(event)
     
     def on_arrow_key(self, event):
-        """Yukarı/aşağı ok tuşları için çağrılır"""
-        # TreeView'da bir öğe seçiliyse
-        if self.tree.selection():
-            self.center_selected_item(event)
+        """Yukarı/aşağı ok tuşları için çağrılır - Treeview'da sadece görünen satırlar olduğu için liste üzerinden"""
+        self.grid.move_selection(-1 if event.keysym == "Up" else 1)
+        return "break"
     
     def on_page_key(self, event):
         """Page Up/Down tuşları için çağrılır"""
-        # Kısa bir gecikme ile ortalama (sayfa kaydırma bittikten sonra)
-        self.root.after(50, lambda: self.center_selected_item(event))
+        page = self.grid.visible_rows()
+        self.grid.move_selection(-page if event.keysym == "Prior" else page)
+        return "break"
     
     def on_home_end_key(self, event):
         """Home/End tuşları için çağrılır"""
-        # Kısa bir gecikme ile ortalama
-        self.root.after(50, lambda: self.center_selected_item(event))
+        self.grid.move_selection(-len(self.grid) if event.keysym == "Home" else len(self.grid))
+        return "break"
     
     def center_selected_item(self, event=None):
         """Seçili öğeyi TreeView'ın ortasına kaydırır"""
@@ -1395,33 +1503,11 @@ class InventoryApp:
         if not selection:
             return
             
-        # Seçili öğenin ID'sini al
-        item_id = selection[0]
-        
         try:
-            # Öğeyi görüntüle
-            self.tree.see(item_id)
-            
-            # Seçili öğenin y-koordinatını al (0-1 arasında bir değer olarak)
-            bbox = self.tree.bbox(item_id)
-            if not bbox:
-                return
-                
-            # Görünür alanın yüksekliği
-            tree_height = self.tree.winfo_height()
-            
-            # Öğeyi merkeze getirmek için kaydırma konumunu hesapla
-            visible_rows = tree_height // 25  # 25 = satır yüksekliği
-            middle_offset = visible_rows // 2
-            
-            # Seçili öğenin indeksini al
-            items = self.tree.get_children()
-            index = items.index(item_id)
-            
-            # Merkeze kaydır
-            top_index = max(0, index - middle_offset)
-            if top_index < len(items):
-                self.tree.yview_moveto(top_index / len(items))
+            # Sanal listede konuma göre kaydır - pencere zaten doğruysa yeniden çizilmez
+            key = self.grid.key_of(selection[0])
+            if key is not None:
+                self.grid.see(key, center=True)
         except Exception as e:
             print(f"Center item error: {e}")
 
@@ -1449,7 +1535,7 @@ class InventoryApp:
             
         # Ürünün görüntüsünü kontrol et - item_number ile sorgula
         try:
-            conn = sqlite3.connect("database.db")
+            conn = inventory_db.connect(DATABASE)
             cursor = conn.cursor()
             cursor.execute("SELECT image_path FROM inventory WHERE item_number = ?", (item_number,))
             result = cursor.fetchone()
@@ -1473,10 +1559,13 @@ class InventoryApp:
             
         try:
             # Veritabanından sil - item_number ile sil (daha güvenilir)
-            conn = sqlite3.connect("database.db")
+            conn = inventory_db.connect(DATABASE)
             cursor = conn.cursor()
             
-            # Ürünü sil
+            # Ürünü sil (aynı ürün numaralı tüm satırlar)
+            removed = [row[0] for row in cursor.execute(
+                "SELECT rowid FROM inventory WHERE item_number = ?", (item_number,)
+            )]
             cursor.execute("DELETE FROM inventory WHERE item_number = ?", (item_number,))
             conn.commit()
             conn.close()
@@ -1489,23 +1578,24 @@ class InventoryApp:
                     try:
                         os.remove(image_path)
                         print(f"Resim silindi: {image_path}")
+                        # Manifest'te resmi yok olarak işaretle
+                        conn = inventory_db.connect(DATABASE)
+                        inventory_db.record_image(conn, image_path)
+                        conn.commit()
+                        conn.close()
                     except Exception as e:
                         print(f"Resim silinirken hata: {e}")
             
-            # TreeView'dan seçili öğeyi kaldır
-            self.tree.delete(selected_item)
-            
-            # Toplam değeri güncelle
-            self.calculate_total_value()
+            # Sadece silinen satırları listeden kaldır ve toplam değeri güncelle
+            self.apply_changes(removed=removed)
             
             messagebox.showinfo("Success", f"Item {item_number} has been deleted.")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete item: {e}")
             print(f"Delete error: {e}")
-            
-        # Envanteri yenile
-        self.load_inventory()
+            # Hata durumunda liste veritabanıyla yeniden eşitlenir
+            self.load_inventory()
 
     def upload_image(self, item_number, image_label, current_image_path=None):
         """Resim yükleme fonksiyonu
@@ -1535,7 +1625,7 @@ class InventoryApp:
             
             # Benzersiz dosya adı oluştur - Standart format  
             # ID'yi veritabanından al
-            conn = sqlite3.connect("database.db")
+            conn = inventory_db.connect(DATABASE)
             cursor = conn.cursor()
             cursor.execute("SELECT id FROM inventory WHERE item_number = ?", (item_number,))
             result = cursor.fetchone()
@@ -1551,6 +1641,12 @@ class InventoryApp:
             
             # Dosyayı kopyala
             copyfile(file_path, destination)
+
+            # Manifest'e yeni resmi kaydet
+            conn = inventory_db.connect(DATABASE)
+            inventory_db.record_image(conn, destination)
+            conn.commit()
+            conn.close()
             
             # Thumbnail oluştur
             self.create_thumbnail(destination, item_number, force_recreate=True)
@@ -7,23 +7,32 @@ import uuid
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
+import inventory_db
+import image_derivatives
+import web_utils
+import inventory_export
+import inventory_batch
+
 # Exe için klasör yolu ayarla - Standart yaklaşım
 if getattr(sys, 'frozen', False):
     # Exe durumunda - exe'nin yanındaki klasör
     app_dir = os.path.dirname(sys.executable)
     DATABASE = os.path.join(app_dir, "database.db")
     UPLOAD_FOLDER = os.path.join(app_dir, 'static', 'uploads')
+    DERIVATIVE_FOLDER = os.path.join(app_dir, 'static', 'derivatives')
     static_folder = os.path.join(app_dir, 'static')
     print(f"🔧 Running as EXE - Upload folder: {UPLOAD_FOLDER}")
 else:
     # Normal Python durumunda
     DATABASE = "database.db"
     UPLOAD_FOLDER = 'static/uploads'
+    DERIVATIVE_FOLDER = 'static/derivatives'
     static_folder = 'static'
     print(f"🔧 Running as Script - Upload folder: {UPLOAD_FOLDER}")
 
 app = Flask(__name__, static_folder=static_folder)
 CORS(app)  # CORS'u açarak Android uygulamasının bağlanmasını sağlıyoruz
+web_utils.init_compression(app)  # JSON yanıtları mobil veri için gzip/brotli ile sıkıştırılır
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 # Create upload folder if it doesn't exist
@@ -36,8 +45,7 @@ def allowed_file(filename):
 
 
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
+    conn = inventory_db.connect(DATABASE, row_factory=sqlite3.Row)
     return conn
 
 
@@ -87,6 +95,8 @@ def initialize_database():
                 pass
 
     conn.commit()
+
+    inventory_db.ensure_schema(conn)
     conn.close()
 
 
@@ -100,13 +110,167 @@ def home():
     return jsonify({"message": "Flask server is running!"})
 
 
+def _inventory_query(conn):
+    select = ", ".join(f'"{column}"' for column in inventory_export.public_columns(conn))
+    return f"SELECT {select} FROM inventory ORDER BY updated_at DESC, id DESC"
+
+
+def _build_inventory_json(conn):
+    # Sürüm ve satırlar aynı okuma transaction'ında okunur (WAL anlık görüntüsü)
+    conn.execute("BEGIN")
+    try:
+        version = inventory_db.get_version(conn)
+        items = conn.execute(_inventory_query(conn)).fetchall()
+    finally:
+        conn.rollback()
+    # jsonify ile bayt bayt aynı çıktı
+    return version, app.json.response([dict(item) for item in items]).get_data()
+
+
+def _build_inventory_msgpack(conn):
+    conn.execute("BEGIN")
+    try:
+        version = inventory_db.get_version(conn)
+        cursor = conn.execute(_inventory_query(conn))
+        columns = [column[0] for column in cursor.description]
+        rows = [list(row) for row in cursor]
+    finally:
+        conn.rollback()
+    return version, web_utils.msgpack.packb({"columns": columns, "rows": rows}, use_bin_type=True)
+
+
+# Serileştirilmiş envanter - değişiklik sayacı artmadıkça tekrar üretilmez
+_inventory_snapshot = web_utils.VersionedSnapshot(_build_inventory_json)
+_inventory_msgpack_snapshot = web_utils.VersionedSnapshot(_build_inventory_msgpack)
+
+
 # 📌 Envanteri alma (GET)
+# Tüm mobil API uçları "Accept: application/msgpack" ile MessagePack döndürür; satır listeleri
+# {"columns": [...], "rows": [[...], ...]} biçimindedir. Varsayılan biçim JSON'dur.
+# Parametresiz istek tüm envanteri (önbellekli anlık görüntü) liste olarak döndürür.
+# ?limit=, ?cursor=, ?fields= verilirse id sırasında sayfalı yanıt döner:
+#   /inventory?limit=200&fields=id,item_number,title,available_quantity,start_price
+#   -> {"items": [...], "next_cursor": "412"}  (son sayfada next_cursor null)
 @app.route("/inventory", methods=["GET"])
 def get_inventory():
+    if not any(param in request.args for param in ("limit", "cursor", "fields")):
+        binary = web_utils.wants_msgpack()
+        snapshot = _inventory_msgpack_snapshot if binary else _inventory_snapshot
+        conn = get_db_connection()
+        try:
+            body, etag = snapshot.get(conn, inventory_db.get_version(conn))
+        finally:
+            conn.close()
+        mimetype = web_utils.MSGPACK_MIMETYPE if binary else "application/json"
+        return web_utils.snapshot_response(body, etag, mimetype, vary="Accept")
+    return _get_inventory_page()
+
+
+def _parse_limit(default):
+    """?limit= değeri; tam sayı değilse veya 1-5000 aralığı dışındaysa None"""
+    try:
+        limit = int(request.args.get("limit", default))
+    except ValueError:
+        return None
+    return limit if 1 <= limit <= 5000 else None
+
+
+def _get_inventory_page():
+    limit = _parse_limit(100)
+    if limit is None:
+        return jsonify({"error": "limit 1 ile 5000 arasında olmalı"}), 400
+    cursor = request.args.get("cursor", "").strip()
+    if cursor and not cursor.isdigit():
+        return jsonify({"error": "Geçersiz cursor değeri"}), 400
+
     conn = get_db_connection()
-    items = conn.execute("SELECT * FROM inventory ORDER BY COALESCE(updated_at, '') DESC, id DESC").fetchall()
-    conn.close()
-    return jsonify([dict(item) for item in items])
+    try:
+        try:
+            fields = inventory_export.parse_columns(conn, request.args.get("fields"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        # Sonraki imleç için id her zaman döner
+        if "id" not in fields:
+            fields = ["id"] + fields
+        sql, params = inventory_db.page_query(fields, cursor, limit)
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return web_utils.api_response({
+        "items": web_utils.RowSet(rows, fields),
+        "next_cursor": str(rows[-1]["id"]) if has_more else None,
+    }, conditional=True)
+
+
+# 📌 Değişiklikleri alma (GET) - /inventory/changes?since=<token>&limit=500
+# İlk senkronda since verilmez; yanıttaki "next" bir sonraki istekte since olarak gönderilir.
+# İmleç commit sırasındaki değişiklik numarasıdır - uzun süren yazma işlemlerinin satırları da kaçmaz.
+# "deleted" silinen id'leri içerir; "reset": true ise imleç silme kayıtlarının saklama süresinden
+# (veya önceki sürümün zaman damgalı imleçlerinden) eskidir ve istemci yerel verisini silip
+# since olmadan baştan senkron yapmalıdır.
+@app.route("/inventory/changes", methods=["GET"])
+def get_inventory_changes():
+    since = request.args.get("since", "")
+    limit = _parse_limit(500)
+    if limit is None:
+        return jsonify({"error": "limit 1 ile 5000 arasında olmalı"}), 400
+
+    conn = get_db_connection()
+    try:
+        try:
+            columns = inventory_export.public_columns(conn)
+            sql, params = inventory_db.changes_query(columns, since, limit)
+        except ValueError:
+            return jsonify({"error": "Geçersiz since değeri"}), 400
+        # Sayaç, satırlar ve silmeler aynı anlık görüntüden okunur
+        conn.execute("BEGIN")
+        read_seq = inventory_db.current_change_seq(conn)
+        rows = conn.execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_token = inventory_db.next_change_token(rows, has_more, read_seq)
+        deleted = inventory_db.deletions_since(conn, since, until=next_token)
+        conn.commit()
+        if deleted is None:
+            return web_utils.api_response({"changes": web_utils.RowSet([]), "deleted": [], "next": "",
+                                           "has_more": False, "reset": True})
+        inventory_db.maybe_compact_tombstones(conn)
+    finally:
+        conn.close()
+
+    return web_utils.api_response({
+        # Son sütun (change_seq) sadece imleç içindir
+        "changes": web_utils.RowSet([tuple(row)[:-1] for row in rows], columns),
+        "deleted": deleted,
+        "next": next_token,
+        "has_more": has_more,
+        "reset": False,
+    })
+
+
+# 📌 Envanteri NDJSON akışı olarak alma (GET) - ?columns=, ?depot=, ?search=
+@app.route("/inventory.ndjson", methods=["GET"])
+def get_inventory_ndjson():
+    conn = get_db_connection()
+    try:
+        columns = inventory_export.parse_columns(conn, request.args.get("columns"))
+        sql, params = inventory_export.export_query(
+            conn, columns,
+            depot=request.args.get("depot", "").strip() or None,
+            search=request.args.get("search", "").strip() or None,
+            order_by="updated_at DESC, id DESC",
+        )
+        cursor = conn.execute(sql, params)
+    except ValueError as e:
+        conn.close()
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        conn.close()
+        raise
+    return web_utils.stream_rows(conn, inventory_export.iter_ndjson(cursor, columns), "application/x-ndjson")
 
 
 # 📌 Yeni ürün ekleme (POST)
@@ -114,7 +278,7 @@ def get_inventory():
 def add_item():
     data = request.get_json()
     conn = get_db_connection()
-    now = datetime.utcnow().isoformat()
+    now = inventory_db.utc_now()
 
     # Telefondan gelen ID'yi kullan (eğer varsa)
     client_id = data.get("id", None)
@@ -176,7 +340,8 @@ def add_item():
     conn.commit()
 
     # Eklenen ürünü veritabanından çek
-    item = conn.execute("SELECT * FROM inventory WHERE id = ?", (item_id,)).fetchone()
+    select = ", ".join(f'"{column}"' for column in inventory_export.public_columns(conn))
+    item = conn.execute(f"SELECT {select} FROM inventory WHERE id = ?", (item_id,)).fetchone()
     conn.close()
 
     # Sözlüğe dönüştür
@@ -191,7 +356,7 @@ def add_item():
 def edit_item(id):
     data = request.get_json()
     conn = get_db_connection()
-    now = datetime.utcnow().isoformat()
+    now = inventory_db.utc_now()
     conn.execute(
         "UPDATE inventory SET item_number = ?, title = ?, variation_details = ?, available_quantity = ?, currency = ?, start_price = ?, depot_info = ?, updated_at = ? WHERE id = ?",
         (data["item_number"], data["title"], data.get("variation_details", ""), data["available_quantity"],
@@ -212,6 +377,25 @@ def delete_item(id):
     return jsonify({"message": "Item deleted successfully"})
 
 
+# 📌 Toplu yazma (POST) - {"ops": [{"op_id": "...", "op": "add"|"edit"|"delete", "id": 5, "item": {...}}]}
+# Tüm işlemler tek transaction'da uygulanır; yanıt işlem sırasıyla {"results": [{"op_id", "status", "id"}]}.
+# Ağ hatasından sonra aynı batch tekrar gönderilebilir - uygulanmış op_id'ler "duplicate": true ile döner.
+@app.route("/batch", methods=["POST"])
+def apply_batch():
+    data = web_utils.request_payload()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Geçersiz istek gövdesi"}), 400
+
+    conn = get_db_connection()
+    try:
+        results = inventory_batch.apply_batch(conn, data.get("ops"), inventory_db.utc_now())
+    except inventory_batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        conn.close()
+    return web_utils.api_response({"results": results})
+
+
 # 📌 Resim yükleme (POST)
 @app.route("/upload_image/<int:id>", methods=["POST"])
 def upload_image(id):
@@ -272,6 +456,7 @@ def upload_image(id):
 
         # Veritabanını güncelle - web arayüzü ile aynı format (tam yol)
         conn.execute("UPDATE inventory SET image_path = ? WHERE id = ?", (full_file_path, id))
+        inventory_db.record_image(conn, full_file_path, UPLOAD_FOLDER)
         conn.commit()
         conn.close()
 
@@ -286,7 +471,7 @@ def upload_image(id):
     return jsonify({"error": "File type not allowed"}), 400
 
 
-# 📌 Resim URL'si alma (GET)
+# 📌 Resim URL'si alma (GET) - ?size=thumb|medium|full
 @app.route("/image/<int:id>", methods=["GET"])
 def get_image_url(id):
     conn = get_db_connection()
@@ -296,28 +481,30 @@ def get_image_url(id):
     if result and result['image_path']:
         image_path = result['image_path']
 
-        # Dosya mevcut mu kontrol et
+        # Dosya mevcut mu kontrol et, değilse eski format (upload klasörü) kontrol et
+        if not os.path.exists(image_path):
+            image_path = os.path.join(UPLOAD_FOLDER, os.path.basename(image_path))
+
         if os.path.exists(image_path):
             # Dosya adını al ve Android için göreceli yol döndür
             filename = os.path.basename(image_path)
             android_path = f"static/uploads/{filename}"
 
-            return jsonify({
+            # Küçük kopya istendiyse ilk istekte üret ve onun yolunu döndür
+            size = request.args.get("size", "full")
+            if size != "full":
+                # Bu uç JSON döndürdüğü için Accept başlığı resim formatını belirtmez; Android WebP destekler
+                fmt = image_derivatives.choose_format()
+                derivative_path = image_derivatives.get_derivative(image_path, size, DERIVATIVE_FOLDER, fmt)
+                if derivative_path:
+                    android_path = f"static/derivatives/{os.path.basename(derivative_path)}"
+
+            # Resim değişmediyse istemci 304 alır
+            return web_utils.conditional_json({
                 "success": True,
                 "image_url": android_path,
                 "item_id": id
             })
-        else:
-            # Dosya mevcut değilse, eski format kontrol et
-            filename = os.path.basename(image_path)
-            potential_path = os.path.join(UPLOAD_FOLDER, filename)
-
-            if os.path.exists(potential_path):
-                return jsonify({
-                    "success": True,
-                    "image_url": f"static/uploads/{filename}",
-                    "item_id": id
-                })
 
     # Resim yok
     return jsonify({
@@ -330,46 +517,40 @@ def get_image_url(id):
 # 📌 Resim dosyasını gönderme
 @app.route("/static/uploads/<path:filename>")
 def serve_image(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    # Zaman damgalı dosya adları değişmez - uzun süreli önbellek, ETag ve Range desteği
+    return web_utils.send_cached_file(UPLOAD_FOLDER, filename)
+
+
+# 📌 Küçük resim kopyasını gönderme (thumb/medium)
+@app.route("/static/derivatives/<path:filename>")
+def serve_derivative(filename):
+    # İçerik özetiyle adlandırılmış dosyalar değişmez
+    return web_utils.send_cached_file(DERIVATIVE_FOLDER, filename)
 
 
 # 📌 Tüm resimleri listele
 @app.route("/images", methods=["GET"])
 def get_all_images():
     conn = get_db_connection()
-    results = conn.execute("SELECT id, item_number, image_path FROM inventory WHERE image_path IS NOT NULL").fetchall()
+    results = conn.execute("""
+        SELECT id, item_number, image_path FROM inventory
+        WHERE image_path IS NOT NULL AND image_path != ''
+    """).fetchall()
+    # Resimlerin varlığı manifest'ten okunur (istek sırasında manifest'e yazılmaz)
+    image_paths = inventory_db.image_presence(conn, [result['image_path'] for result in results], UPLOAD_FOLDER)
     conn.close()
 
     images = []
     for result in results:
-        if result['image_path']:
-            image_path = result['image_path']
-
-            # Dosya mevcut mu kontrol et
-            if os.path.exists(image_path):
-                filename = os.path.basename(image_path)
-                android_path = f"static/uploads/{filename}"
-
-                images.append({
-                    "id": result['id'],
-                    "product_id": result['id'],
-                    "image_url": android_path,
-                    "timestamp": "N/A"
-                })
-            else:
-                # Eski format kontrol et
-                filename = os.path.basename(image_path)
-                potential_path = os.path.join(UPLOAD_FOLDER, filename)
-
-                if os.path.exists(potential_path):
-                    images.append({
-                        "id": result['id'],
-                        "product_id": result['id'],
-                        "image_url": f"static/uploads/{filename}",
-                        "timestamp": "N/A"
-                    })
-
-    return jsonify(images)
+        resolved_path = image_paths.get(result['image_path'])
+        if not resolved_path:
+            continue
+        # Android için göreceli yol döndür
+        filename = os.path.basename(resolved_path)
+        images.append((result['id'], result['id'], f"static/uploads/{filename}", "N/A"))
+
+    # JSON'da [{"id", "product_id", "image_url", "timestamp"}, ...] listesi
+    return web_utils.api_response(web_utils.RowSet(images, ("id", "product_id", "image_url", "timestamp")))
 
 
 # 📌 IP Address Update Endpoint for Dynamic IP Monitoring
@@ -395,7 +576,7 @@ def ip_update():
         # Save to IP history database if exists
         try:
             if os.path.exists('ip_history.db'):
-                conn = sqlite3.connect('ip_history.db')
+                conn = inventory_db.connect('ip_history.db')
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO ip_history (ip_address, timestamp, location, isp, change_reason)
@@ -453,7 +634,7 @@ def get_ip_status():
         history = []
         if os.path.exists('ip_history.db'):
             try:
-                conn = sqlite3.connect('ip_history.db')
+                conn = inventory_db.connect('ip_history.db')
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT ip_address, timestamp, location, isp 
@@ -497,6 +678,8 @@ if __name__ == "__main__":
     print("   GET  /api/ip-status - Get current IP status")
     print("⚡ Press Ctrl+C to stop the server")
     print("-" * 50)
+    # Resim manifest'ini arka planda dosya sistemiyle eşitle
+    inventory_db.start_image_reconciler(DATABASE, UPLOAD_FOLDER)
     try:
         app.run(host="0.0.0.0", port=5001, debug=False)
     except KeyboardInterrupt:
@@ -0,0 +1,157 @@
+"""
+Ürün resimleri için küçük boyutlu kopya (thumbnail/medium) üretici
+Kopyalar resim içeriğinin özetiyle (sha1) adlandırılır ve diskte önbelleklenir
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+import inventory_db
+
+# Pillow import (opsiyonel - yoksa her zaman orijinal resim gönderilir)
+try:
+    from PIL import Image, ImageOps, features
+    PIL_AVAILABLE = True
+    WEBP_AVAILABLE = features.check("webp")
+except Exception as pil_error:
+    print(f"Pillow yüklenemedi: {pil_error}")
+    PIL_AVAILABLE = False
+    WEBP_AVAILABLE = False
+    Image = None
+    ImageOps = None
+
+# Boyut adı -> en uzun kenar (piksel). Liste görünümü 150px, yüksek DPI için 2 katı
+DERIVATIVE_SIZES = {"thumb": 300, "medium": 1024}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key):
+    """Aynı kopyanın eşzamanlı isteklerde iki kez üretilmesini engeller"""
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path, size, mtime):
+    # size/mtime önbellek anahtarının parçasıdır - dosya değişirse yeniden hesaplanır
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(path):
+    """Dosya içeriğinin sha1 özetini döndürür (boyut ve değişiklik zamanına göre önbellekli)"""
+    stat = os.stat(path)
+    return _content_hash(path, stat.st_size, stat.st_mtime)
+
+
+def choose_format(accept_header=None):
+    """İstemci destekliyorsa WebP, aksi halde JPEG"""
+    if WEBP_AVAILABLE and (accept_header is None or "image/webp" in accept_header):
+        return "webp"
+    return "jpeg"
+
+
+def derivative_filename(source_path, size, fmt="jpeg"):
+    """Kopyanın dosya adı: <içerik özeti>_<boyut>.<uzantı>"""
+    extension = "webp" if fmt == "webp" else "jpg"
+    return f"{content_hash(source_path)}_{size}.{extension}"
+
+
+def get_derivative(source_path, size, cache_folder, fmt="jpeg"):
+    """İstenen boyuttaki kopyanın yolunu döndürür, yoksa ilk istekte üretir
+
+    Pillow yoksa, boyut bilinmiyorsa veya üretim başarısız olursa None döner;
+    çağıran taraf bu durumda orijinal resmi göndermelidir.
+    """
+    if not PIL_AVAILABLE or size not in DERIVATIVE_SIZES:
+        return None
+    if fmt == "webp" and not WEBP_AVAILABLE:
+        fmt = "jpeg"
+
+    try:
+        filename = derivative_filename(source_path, size, fmt)
+    except OSError:
+        return None
+    target_path = os.path.join(cache_folder, filename)
+    if os.path.exists(target_path):
+        return target_path
+
+    try:
+        with _lock_for(target_path):
+            # Kilidi beklerken başka bir istek üretmiş olabilir
+            if os.path.exists(target_path):
+                return target_path
+            return _render_derivative(source_path, target_path, size, cache_folder, fmt)
+    finally:
+        with _locks_guard:
+            _locks.pop(target_path, None)
+
+
+def _render_derivative(source_path, target_path, size, cache_folder, fmt):
+    """Kopyayı üretip diske yazar; hata durumunda None döner"""
+    # Önce geçici dosyaya yaz, sonra atomik olarak yerine taşı
+    temp_path = f"{target_path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        with Image.open(source_path) as img:
+            img = ImageOps.exif_transpose(img)
+            max_side = DERIVATIVE_SIZES[size]
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+            if img.mode not in ("RGB", "RGBA") or (fmt == "jpeg" and img.mode == "RGBA"):
+                img = img.convert("RGB")
+
+            if fmt == "webp":
+                img.save(temp_path, "WEBP", quality=80, method=4)
+            else:
+                img.save(temp_path, "JPEG", quality=82, optimize=True, progressive=True)
+        os.replace(temp_path, target_path)
+        return target_path
+    except Exception as e:
+        print(f"Resim kopyası oluşturma hatası ({source_path}, {size}): {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+
+
+def pregenerate(database, cache_folder, upload_folder=None, sizes=None, formats=None):
+    """Veritabanındaki tüm resimler için kopyaları toplu olarak üretir"""
+    sizes = sizes or list(DERIVATIVE_SIZES)
+    formats = formats or (["webp", "jpeg"] if WEBP_AVAILABLE else ["jpeg"])
+
+    conn = inventory_db.connect(database)
+    rows = conn.execute(
+        "SELECT DISTINCT image_path FROM inventory WHERE image_path IS NOT NULL AND image_path != ''"
+    ).fetchall()
+    conn.close()
+
+    created = 0
+    for (image_path,) in rows:
+        source_path = image_path
+        if not os.path.exists(source_path) and upload_folder:
+            source_path = os.path.join(upload_folder, os.path.basename(image_path))
+        if not os.path.exists(source_path):
+            continue
+        for size in sizes:
+            for fmt in formats:
+                if get_derivative(source_path, size, cache_folder, fmt):
+                    created += 1
+    print(f"{len(rows)} resim için {created} kopya hazır: {cache_folder}")
+    return created
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ürün resimleri için thumbnail/medium kopyalarını önceden üretir")
+    parser.add_argument("--database", default="database.db")
+    parser.add_argument("--cache-folder", default=os.path.join("static", "derivatives"))
+    parser.add_argument("--upload-folder", default=os.path.join("static", "uploads"))
+    parser.add_argument("--sizes", nargs="+", choices=sorted(DERIVATIVE_SIZES))
+    args = parser.parse_args()
+    pregenerate(args.database, args.cache_folder, args.upload_folder, args.sizes)
@@ -0,0 +1,213 @@
+"""
+Mobil API için toplu yazma (POST /batch)
+Ekleme/güncelleme/silme işlemleri tek transaction'da, ardışık aynı tür işlemler executemany ile uygulanır
+"""
+
+import json
+import sqlite3
+
+MAX_BATCH_OPS = 1000
+OPERATIONS = ("add", "edit", "delete")
+REQUIRED_FIELDS = ("item_number", "title", "available_quantity", "currency", "start_price")
+# Veritabanına yazılan item alanları - sadece SQLite'a bağlanabilen tek değerler kabul edilir
+ITEM_FIELDS = REQUIRED_FIELDS + ("variation_details", "depot_info", "image_url")
+_SCALAR_TYPES = (str, int, float, type(None))
+
+_INSERT_SQL = (
+    "INSERT INTO inventory (id, item_number, title, variation_details, available_quantity, currency, "
+    "start_price, depot_info, image_path, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_UPDATE_SQL = (
+    "UPDATE inventory SET item_number = ?, title = ?, variation_details = ?, available_quantity = ?, "
+    "currency = ?, start_price = ?, depot_info = ?, updated_at = ? WHERE id = ?"
+)
+_DELETE_SQL = "DELETE FROM inventory WHERE id = ?"
+
+
+class BatchError(ValueError):
+    """İstek gövdesi bir batch olarak işlenemiyor"""
+
+
+def _is_id(value):
+    # bool, int'in alt sınıfıdır - true/false id olarak kabul edilmez
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate(op):
+    """İşlemi doğrular; geçersizse hata mesajı, geçerliyse None döner"""
+    if not isinstance(op, dict):
+        return "İşlem bir nesne olmalı"
+    if not isinstance(op.get("op_id"), str) or not op["op_id"]:
+        return "op_id gerekli"
+    kind = op.get("op")
+    if kind not in OPERATIONS:
+        return f"op şunlardan biri olmalı: {', '.join(OPERATIONS)}"
+    if kind in ("edit", "delete") and not _is_id(op.get("id")):
+        return "id gerekli"
+    if kind in ("add", "edit"):
+        item = op.get("item")
+        if not isinstance(item, dict):
+            return "item gerekli"
+        missing = [field for field in REQUIRED_FIELDS if item.get(field) in (None, "")]
+        if missing:
+            return f"Eksik alanlar: {', '.join(missing)}"
+        invalid = [field for field in ITEM_FIELDS if not isinstance(item.get(field), _SCALAR_TYPES)]
+        if invalid:
+            return f"Alanlar metin veya sayı olmalı: {', '.join(invalid)}"
+        try:
+            if int(item["available_quantity"]) < 0 or float(item["start_price"]) < 0:
+                return "available_quantity ve start_price negatif olamaz"
+        except (TypeError, ValueError):
+            return "available_quantity ve start_price sayı olmalı"
+    return None
+
+
+def _item_values(item):
+    return (
+        item["item_number"],
+        item["title"],
+        item.get("variation_details", ""),
+        item["available_quantity"],
+        item["currency"],
+        item["start_price"],
+        item.get("depot_info", ""),
+    )
+
+
+def _existing_ids(conn, ids):
+    found = set()
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        found.update(row[0] for row in conn.execute(f"SELECT id FROM inventory WHERE id IN ({placeholders})", chunk))
+    return found
+
+
+def _apply_adds(conn, ops, now):
+    """Eklemeler: telefonun gönderdiği id kullanılır, çakışırsa (tek eklemedeki gibi) yeni id atanır"""
+    requested = [op.get("id") or op["item"].get("id") for op in ops]
+    taken = _existing_ids(conn, [item_id for item_id in requested if _is_id(item_id) and item_id > 0])
+    # Yazma kilidi altındayız - MAX(id) sonrası id'ler başka bir yazar tarafından alınamaz
+    next_id = (conn.execute("SELECT MAX(id) FROM inventory").fetchone()[0] or 0) + 1
+    next_id = max([next_id] + [item_id + 1 for item_id in requested if _is_id(item_id) and item_id > 0])
+
+    rows, results = [], []
+    for op, item_id in zip(ops, requested):
+        if not _is_id(item_id) or item_id <= 0 or item_id in taken:
+            item_id = next_id
+            next_id += 1
+        taken.add(item_id)
+        rows.append((item_id,) + _item_values(op["item"]) + (op["item"].get("image_url"), now))
+        results.append({"op_id": op["op_id"], "status": "created", "id": item_id})
+    conn.executemany(_INSERT_SQL, rows)
+    return results
+
+
+def _apply_edits(conn, ops, now):
+    existing = _existing_ids(conn, {op["id"] for op in ops})
+    found = [op for op in ops if op["id"] in existing]
+    conn.executemany(_UPDATE_SQL, [_item_values(op["item"]) + (now, op["id"]) for op in found])
+    return [{"op_id": op["op_id"], "status": "updated" if op["id"] in existing else "not_found", "id": op["id"]}
+            for op in ops]
+
+
+def _apply_deletes(conn, ops, now):
+    existing = _existing_ids(conn, {op["id"] for op in ops})
+    conn.executemany(_DELETE_SQL, [(op["id"],) for op in ops if op["id"] in existing])
+    return [{"op_id": op["op_id"], "status": "deleted" if op["id"] in existing else "not_found", "id": op["id"]}
+            for op in ops]
+
+
+_APPLY = {"add": _apply_adds, "edit": _apply_edits, "delete": _apply_deletes}
+
+
+# Tek bir işlemin verisinden kaynaklanan hatalar - batch'in geri kalanı etkilenmez
+_OP_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError)
+
+
+def _apply_run(conn, kind, ops, now):
+    """Aynı türden ardışık işlemleri uygular; kısıt/bağlama hatasında işlem işlem tekrar dener"""
+    conn.execute("SAVEPOINT batch_run")
+    try:
+        results = _APPLY[kind](conn, ops, now)
+        conn.execute("RELEASE batch_run")
+        return results
+    except _OP_ERRORS:
+        conn.execute("ROLLBACK TO batch_run")
+        conn.execute("RELEASE batch_run")
+
+    # Hangi işlemin hatalı olduğunu bulmak için tek tek (her biri kendi savepoint'inde)
+    results = []
+    for op in ops:
+        conn.execute("SAVEPOINT batch_op")
+        try:
+            results.extend(_APPLY[kind](conn, [op], now))
+            conn.execute("RELEASE batch_op")
+        except _OP_ERRORS as e:
+            conn.execute("ROLLBACK TO batch_op")
+            conn.execute("RELEASE batch_op")
+            results.append({"op_id": op["op_id"], "status": "error", "error": str(e)})
+    return results
+
+
+def apply_batch(conn, ops, now):
+    """İşlemleri sırasıyla tek transaction'da uygular ve işlem başına sonuç listesi döndürür
+
+    Daha önce uygulanmış op_id'ler tekrar uygulanmaz, kayıtlı sonuçları "duplicate": true ile döner.
+    Geçersiz işlemler "error" sonucu alır, diğer işlemleri etkilemez.
+    """
+    if not isinstance(ops, list):
+        raise BatchError("ops bir liste olmalı")
+    if len(ops) > MAX_BATCH_OPS:
+        raise BatchError(f"Bir batch en fazla {MAX_BATCH_OPS} işlem içerebilir")
+
+    results = [None] * len(ops)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        op_ids = [op.get("op_id") for op in ops if isinstance(op, dict) and isinstance(op.get("op_id"), str)]
+        applied = {}
+        for start in range(0, len(op_ids), 500):
+            chunk = op_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            applied.update(conn.execute(f"SELECT op_id, result FROM batch_ops WHERE op_id IN ({placeholders})", chunk))
+
+        # Ardışık aynı türden geçerli işlemler tek executemany ile uygulanır
+        seen = set()
+        run_kind, run = None, []
+
+        def flush():
+            if run:
+                for (index, _), result in zip(run, _apply_run(conn, run_kind, [op for _, op in run], now)):
+                    results[index] = result
+
+        for index, op in enumerate(ops):
+            error = _validate(op)
+            if error:
+                results[index] = {"op_id": op.get("op_id") if isinstance(op, dict) else None,
+                                  "status": "error", "error": error}
+                continue
+            if op["op_id"] in applied:
+                results[index] = dict(json.loads(applied[op["op_id"]]), duplicate=True)
+                continue
+            if op["op_id"] in seen:
+                results[index] = {"op_id": op["op_id"], "status": "error", "error": "op_id batch içinde tekrarlanmış"}
+                continue
+            seen.add(op["op_id"])
+            if op["op"] != run_kind:
+                flush()
+                run_kind, run = op["op"], []
+            run.append((index, op))
+        flush()
+
+        conn.executemany(
+            "INSERT INTO batch_ops (op_id, result, applied_at) VALUES (?, ?, ?)",
+            [(result["op_id"], json.dumps(result), now)
+             for result in results
+             if result["status"] != "error" and not result.get("duplicate")],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return results
@@ -0,0 +1,1272 @@
+"""
+Ortak envanter veritabanı yardımcıları
+app.py, flaskapi.py ve envanterdesktop.py tarafından paylaşılan bağlantı havuzu ve şema/indeks işlemleri
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+
+# Bağlantı havuzu - her çağrıda yeniden bağlanmak yerine açık bağlantılar tekrar kullanılır
+POOL_MAX_IDLE = 8
+BUSY_TIMEOUT_MS = 5000
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",  # WAL ile güvenli, her commit'te fsync yapmaz
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size=-16000",  # 16 MB sayfa önbelleği
+    "PRAGMA mmap_size=67108864",  # 64 MB bellek eşlemeli okuma
+    "PRAGMA temp_store=MEMORY",
+)
+
+_pools = {}
+_pools_guard = threading.Lock()
+
+
+class PooledConnection(sqlite3.Connection):
+    """close() çağrıldığında kapanmak yerine havuza geri dönen bağlantı"""
+
+    _pool_key = None
+    _checked_out = False
+
+    def close(self):
+        release(self)
+
+    def close_for_real(self):
+        super().close()
+
+
+def _open_connection(database, key):
+    conn = sqlite3.connect(
+        database,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        factory=PooledConnection,
+        cached_statements=256,
+        check_same_thread=False,  # Bağlantılar thread'ler arasında havuz üzerinden el değiştirir
+    )
+    conn._pool_key = key
+    try:
+        # WAL: okuyucular yazıcıyı, yazıcı okuyucuları beklemez; ayar dosyada kalıcıdır
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError as e:
+        print(f"WAL moduna geçilemedi ({database}): {e}")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def connect(database, row_factory=None):
+    """Havuzdan bir bağlantı alır, havuz boşsa yenisini açar (WAL, busy_timeout)
+
+    Dönen bağlantı sqlite3.Connection gibi kullanılır; close() bağlantıyı havuza iade eder.
+    """
+    key = os.path.abspath(database)
+    conn = None
+    with _pools_guard:
+        idle = _pools.get(key)
+        if idle:
+            conn = idle.pop()
+    if conn is None:
+        conn = _open_connection(database, key)
+    conn._checked_out = True
+    conn.row_factory = row_factory
+    return conn
+
+
+def release(conn):
+    """Bağlantıyı havuza iade eder - commit edilmemiş değişiklikler geri alınır (sqlite3 close() gibi)"""
+    if not conn._checked_out:
+        return
+    conn._checked_out = False
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+    except sqlite3.Error:
+        conn.close_for_real()
+        return
+    with _pools_guard:
+        idle = _pools.setdefault(conn._pool_key, [])
+        if len(idle) < POOL_MAX_IDLE:
+            idle.append(conn)
+            return
+    conn.close_for_real()
+
+
+def close_all():
+    """Havuzdaki boştaki tüm bağlantıları kapatır"""
+    with _pools_guard:
+        pools = list(_pools.values())
+        _pools.clear()
+    for idle in pools:
+        for conn in idle:
+            conn.close_for_real()
+
+
+# FTS5 desteğini kontrol et - bazı SQLite derlemelerinde bulunmayabilir
+def _check_fts5():
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE fts5_probe USING fts5(x)")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+FTS5_AVAILABLE = _check_fts5()
+if not FTS5_AVAILABLE:
+    print("SQLite FTS5 desteği yok, arama LIKE ile yapılacak")
+
+FTS_TRIGGERS = {
+    "inventory_fts_ai": """
+        CREATE TRIGGER IF NOT EXISTS inventory_fts_ai AFTER INSERT ON inventory BEGIN
+            INSERT INTO inventory_fts(rowid, item_number, title, variation_details)
+            VALUES (new.rowid, new.item_number, new.title, new.variation_details);
+        END
+    """,
+    "inventory_fts_ad": """
+        CREATE TRIGGER IF NOT EXISTS inventory_fts_ad AFTER DELETE ON inventory BEGIN
+            INSERT INTO inventory_fts(inventory_fts, rowid, item_number, title, variation_details)
+            VALUES ('delete', old.rowid, old.item_number, old.title, old.variation_details);
+        END
+    """,
+    # id INTEGER PRIMARY KEY olduğunda id değişimi rowid'i de değiştirir
+    "inventory_fts_au": """
+        CREATE TRIGGER IF NOT EXISTS inventory_fts_au
+        AFTER UPDATE OF id, item_number, title, variation_details ON inventory BEGIN
+            INSERT INTO inventory_fts(inventory_fts, rowid, item_number, title, variation_details)
+            VALUES ('delete', old.rowid, old.item_number, old.title, old.variation_details);
+            INSERT INTO inventory_fts(rowid, item_number, title, variation_details)
+            VALUES (new.rowid, new.item_number, new.title, new.variation_details);
+        END
+    """,
+}
+
+
+def _table_exists(conn, name):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def _existing_triggers(conn, names):
+    placeholders = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+        tuple(names),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _create_missing_triggers(conn, triggers):
+    """Eksik trigger'ları oluşturur ve eksik olanların adlarını döndürür"""
+    missing = set(triggers) - _existing_triggers(conn, triggers)
+    for name in missing:
+        conn.execute(triggers[name])
+    return missing
+
+
+def rebuild_search_index(conn):
+    """FTS5 indeksini inventory tablosundan baştan kurar"""
+    conn.execute("INSERT INTO inventory_fts(inventory_fts) VALUES ('rebuild')")
+
+
+def ensure_search_index(conn):
+    """FTS5 arama tablosunu ve senkron trigger'larını oluşturur, gerekirse indeksi yeniden kurar"""
+    if not FTS5_AVAILABLE or not _table_exists(conn, "inventory"):
+        return False
+
+    index_exists = _table_exists(conn, "inventory_fts")
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS inventory_fts USING fts5(
+            item_number, title, variation_details,
+            content='inventory',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    missing_triggers = _create_missing_triggers(conn, FTS_TRIGGERS)
+
+    # Tablo yeni oluşturulduysa veya trigger'lar kaybolduysa (ör. pandas to_sql replace)
+    # indeks inventory ile senkron değildir - baştan kur
+    if not index_exists or missing_triggers:
+        rebuild_search_index(conn)
+        print("Arama indeksi (FTS5) yeniden oluşturuldu")
+
+    conn.commit()
+    return True
+
+
+# Sayaç trigger'ları için satır katkısı ifadeleri (new/old önekiyle doldurulur)
+_STATS_VALUE_EXPR = "CASE WHEN typeof({r}.start_price) = 'text' THEN 0 ELSE COALESCE({r}.available_quantity * {r}.start_price, 0) END"
+_STATS_QUANTITY_EXPR = "COALESCE({r}.available_quantity, 0)"
+
+
+def _stats_add_sql(r):
+    """Bir satırın sayaçlara eklenmesi için trigger gövdesi"""
+    value = _STATS_VALUE_EXPR.format(r=r)
+    quantity = _STATS_QUANTITY_EXPR.format(r=r)
+    return f"""
+        UPDATE inventory_stats SET total_rows = total_rows + 1, total_quantity = total_quantity + {quantity} WHERE id = 1;
+        INSERT OR IGNORE INTO inventory_item_counts (item_number, row_count)
+            SELECT {r}.item_number, 0 WHERE {r}.item_number IS NOT NULL;
+        UPDATE inventory_item_counts SET row_count = row_count + 1 WHERE item_number = {r}.item_number;
+        UPDATE inventory_stats SET distinct_items = distinct_items + 1
+            WHERE id = 1 AND (SELECT row_count FROM inventory_item_counts WHERE item_number = {r}.item_number) = 1;
+        INSERT OR IGNORE INTO inventory_currency_stats (currency) VALUES (COALESCE({r}.currency, ''));
+        UPDATE inventory_currency_stats
+            SET row_count = row_count + 1, total_quantity = total_quantity + {quantity}, total_value = total_value + {value}
+            WHERE currency = COALESCE({r}.currency, '');
+    """
+
+
+def _stats_remove_sql(r):
+    """Bir satırın sayaçlardan çıkarılması için trigger gövdesi"""
+    value = _STATS_VALUE_EXPR.format(r=r)
+    quantity = _STATS_QUANTITY_EXPR.format(r=r)
+    return f"""
+        UPDATE inventory_stats SET total_rows = total_rows - 1, total_quantity = total_quantity - {quantity} WHERE id = 1;
+        UPDATE inventory_item_counts SET row_count = row_count - 1 WHERE item_number = {r}.item_number;
+        UPDATE inventory_stats SET distinct_items = distinct_items - 1
+            WHERE id = 1 AND (SELECT row_count FROM inventory_item_counts WHERE item_number = {r}.item_number) = 0;
+        DELETE FROM inventory_item_counts WHERE item_number = {r}.item_number AND row_count <= 0;
+        UPDATE inventory_currency_stats
+            SET row_count = row_count - 1, total_quantity = total_quantity - {quantity}, total_value = total_value - {value}
+            WHERE currency = COALESCE({r}.currency, '');
+        DELETE FROM inventory_currency_stats WHERE currency = COALESCE({r}.currency, '') AND row_count <= 0;
+    """
+
+
+STATS_TRIGGERS = {
+    "inventory_stats_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_stats_ai AFTER INSERT ON inventory BEGIN
+            {_stats_add_sql("new")}
+        END
+    """,
+    "inventory_stats_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_stats_ad AFTER DELETE ON inventory BEGIN
+            {_stats_remove_sql("old")}
+        END
+    """,
+    "inventory_stats_au": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_stats_au
+        AFTER UPDATE OF item_number, available_quantity, currency, start_price ON inventory BEGIN
+            {_stats_remove_sql("old")}
+            {_stats_add_sql("new")}
+        END
+    """,
+}
+
+
+def rebuild_stats(conn):
+    """Sayaç tablolarını inventory tablosundan baştan hesaplar"""
+    conn.execute("DELETE FROM inventory_item_counts")
+    conn.execute("DELETE FROM inventory_currency_stats")
+    conn.execute("""
+        INSERT INTO inventory_item_counts (item_number, row_count)
+        SELECT item_number, COUNT(*) FROM inventory WHERE item_number IS NOT NULL GROUP BY item_number
+    """)
+    conn.execute(f"""
+        INSERT INTO inventory_currency_stats (currency, row_count, total_quantity, total_value)
+        SELECT COALESCE(currency, ''), COUNT(*), SUM({_STATS_QUANTITY_EXPR.format(r="inventory")}),
+               SUM({_STATS_VALUE_EXPR.format(r="inventory")})
+        FROM inventory
+        GROUP BY COALESCE(currency, '')
+    """)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO inventory_stats (id, total_rows, distinct_items, total_quantity)
+        SELECT 1, COUNT(*), (SELECT COUNT(*) FROM inventory_item_counts),
+               COALESCE(SUM({_STATS_QUANTITY_EXPR.format(r="inventory")}), 0)
+        FROM inventory
+    """)
+
+
+def ensure_stats(conn):
+    """Sayaç tablolarını ve trigger'larını oluşturur, gerekirse sayaçları yeniden hesaplar"""
+    if not _table_exists(conn, "inventory"):
+        return False
+
+    stats_exist = _table_exists(conn, "inventory_stats")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_rows INTEGER NOT NULL DEFAULT 0,
+            distinct_items INTEGER NOT NULL DEFAULT 0,
+            total_quantity INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_item_counts (
+            item_number TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_currency_stats (
+            currency TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            total_quantity INTEGER NOT NULL DEFAULT 0,
+            total_value REAL NOT NULL DEFAULT 0
+        )
+    """)
+    missing_triggers = _create_missing_triggers(conn, STATS_TRIGGERS)
+
+    if not stats_exist or missing_triggers:
+        rebuild_stats(conn)
+        print("Envanter sayaçları yeniden hesaplandı")
+
+    conn.commit()
+    return True
+
+
+def get_stats(conn):
+    """Satır sayısı, benzersiz ürün sayısı, toplam adet ve para birimine göre değeri O(1) okur"""
+    try:
+        row = conn.execute(
+            "SELECT total_rows, distinct_items, total_quantity FROM inventory_stats WHERE id = 1"
+        ).fetchone()
+        currency_rows = conn.execute(
+            "SELECT currency, total_value FROM inventory_currency_stats"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        row = None
+
+    if row is None:
+        # Sayaç tablosu henüz yoksa eski yöntemle hesapla
+        row = conn.execute(f"""
+            SELECT COUNT(*), COUNT(DISTINCT item_number),
+                   COALESCE(SUM({_STATS_QUANTITY_EXPR.format(r="inventory")}), 0)
+            FROM inventory
+        """).fetchone()
+        currency_rows = conn.execute(f"""
+            SELECT COALESCE(currency, ''), SUM({_STATS_VALUE_EXPR.format(r="inventory")})
+            FROM inventory GROUP BY COALESCE(currency, '')
+        """).fetchall()
+
+    currency_values = {currency: value or 0 for currency, value in currency_rows}
+    return {
+        "total_rows": row[0],
+        "distinct_items": row[1],
+        "total_quantity": row[2],
+        "currency_values": currency_values,
+        "total_value": sum(currency_values.values()),
+    }
+
+
+# Grup anahtarı: gruplama modunda aynı satırda gösterilen kayıtlar
+_GROUP_KEY_MATCH = (
+    "item_number IS {r}.item_number AND title IS {r}.title "
+    "AND currency IS {r}.currency AND depot_info IS {r}.depot_info"
+)
+
+_GROUP_SELECT = """
+    SELECT item_number, title, currency, depot_info,
+           MIN(id),
+           GROUP_CONCAT(DISTINCT variation_details),
+           SUM(available_quantity),
+           AVG(start_price),
+           COUNT(*),
+           (SELECT image_path FROM inventory i2
+            WHERE i2.item_number = inventory.item_number AND i2.image_path IS NOT NULL LIMIT 1)
+    FROM inventory
+"""
+
+_GROUP_INSERT = """
+    INSERT INTO inventory_groups (item_number, title, currency, depot_info, min_id, variation_details,
+                                  total_quantity, avg_price, variant_count, image_path)
+"""
+
+
+def _group_refresh_sql(r):
+    """Tek bir grubun özet satırını inventory'den yeniden hesaplayan trigger gövdesi"""
+    key_match = _GROUP_KEY_MATCH.format(r=r)
+    return f"""
+        DELETE FROM inventory_groups WHERE {key_match};
+        {_GROUP_INSERT}
+        {_GROUP_SELECT}
+        WHERE {key_match}
+        GROUP BY item_number, title, currency, depot_info;
+        UPDATE inventory_groups
+            SET image_path = (SELECT image_path FROM inventory i2
+                              WHERE i2.item_number = {r}.item_number AND i2.image_path IS NOT NULL LIMIT 1)
+            WHERE item_number IS {r}.item_number;
+    """
+
+
+GROUP_TRIGGERS = {
+    "inventory_groups_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_groups_ai AFTER INSERT ON inventory BEGIN
+            {_group_refresh_sql("new")}
+        END
+    """,
+    "inventory_groups_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_groups_ad AFTER DELETE ON inventory BEGIN
+            {_group_refresh_sql("old")}
+        END
+    """,
+    "inventory_groups_update_new": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_groups_update_new
+        AFTER UPDATE OF id, item_number, title, variation_details, available_quantity,
+                        currency, start_price, depot_info, image_path ON inventory BEGIN
+            {_group_refresh_sql("new")}
+        END
+    """,
+    # Eski grup sadece grup anahtarı değiştiyse yeniden hesaplanır
+    "inventory_groups_update_old": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_groups_update_old
+        AFTER UPDATE OF item_number, title, currency, depot_info ON inventory
+        WHEN NOT (new.item_number IS old.item_number AND new.title IS old.title
+                  AND new.currency IS old.currency AND new.depot_info IS old.depot_info) BEGIN
+            {_group_refresh_sql("old")}
+        END
+    """,
+}
+# Her güncellemede iki grubu da yeniden hesaplayan önceki trigger
+_LEGACY_GROUP_TRIGGERS = ("inventory_groups_au",)
+
+
+def rebuild_groups(conn):
+    """Gruplama özet tablosunu inventory tablosundan baştan hesaplar"""
+    conn.execute("DELETE FROM inventory_groups")
+    conn.execute(f"""
+        {_GROUP_INSERT}
+        {_GROUP_SELECT}
+        GROUP BY item_number, title, currency, depot_info
+    """)
+
+
+def ensure_groups(conn):
+    """Gruplama özet tablosunu (inventory_groups) ve trigger'larını oluşturur"""
+    if not _table_exists(conn, "inventory"):
+        return False
+
+    groups_exist = _table_exists(conn, "inventory_groups")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_groups (
+            item_number TEXT,
+            title TEXT,
+            currency TEXT,
+            depot_info TEXT,
+            min_id INTEGER,
+            variation_details TEXT,
+            total_quantity INTEGER,
+            avg_price REAL,
+            variant_count INTEGER,
+            image_path TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_groups_min_id ON inventory_groups (min_id)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_inventory_groups_key
+        ON inventory_groups (item_number, title, currency, depot_info)
+    """)
+    # Grup yenileme trigger'ları item_number üzerinden arama yapar
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_item_number ON inventory (item_number)")
+    for name in _LEGACY_GROUP_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    missing_triggers = _create_missing_triggers(conn, GROUP_TRIGGERS)
+
+    if not groups_exist or missing_triggers:
+        rebuild_groups(conn)
+        print("Gruplama özet tablosu yeniden oluşturuldu")
+
+    conn.commit()
+    return True
+
+
+# Toplu yüklemede satır başına bakımı durdurulan türetilmiş tablolar: (tablo, trigger'lar, yeniden hesaplama)
+_BULK_SUSPENDED = (
+    ("inventory_fts", FTS_TRIGGERS, rebuild_search_index),
+    ("inventory_stats", STATS_TRIGGERS, rebuild_stats),
+    ("inventory_groups", GROUP_TRIGGERS, rebuild_groups),
+)
+
+
+@contextmanager
+def bulk_load(conn):
+    """Toplu yazma (içe aktarma) süresince arama indeksi, sayaç ve grup trigger'larını kaldırır;
+    blok bitince trigger'ları geri kurar ve bu tabloları bir kez baştan hesaplar
+
+    Çağıran açık bir transaction içinde olmalıdır: trigger silme/oluşturma da aynı transaction'a
+    dahildir, hata olursa rollback trigger'ları da geri getirir. Sürüm, değişiklik sırası ve
+    silme kaydı trigger'ları satır başına çalışmaya devam eder.
+    """
+    suspended = []
+    for table, triggers, rebuild in _BULK_SUSPENDED:
+        existing = _existing_triggers(conn, triggers)
+        if not _table_exists(conn, table) or not existing:
+            continue
+        for name in existing:
+            conn.execute(f"DROP TRIGGER {name}")
+        suspended.append((triggers, rebuild))
+    yield
+    for triggers, rebuild in suspended:
+        _create_missing_triggers(conn, triggers)
+        rebuild(conn)
+
+
+def grouped_page_query(after_id=None, before_id=None, limit=50):
+    """Gruplama modunda bir sayfayı özet tablodan okuyan sorgu ve parametrelerini döndürür"""
+    params = []
+    cursor_sql = ""
+    order = "DESC"
+    if after_id is not None:
+        cursor_sql = "WHERE min_id < ?"
+        params.append(after_id)
+    elif before_id is not None:
+        cursor_sql = "WHERE min_id > ?"
+        params.append(before_id)
+        order = "ASC"
+    params.append(limit)
+    sql = f"""
+        SELECT min_id AS id, item_number, title, variation_details,
+               total_quantity AS available_quantity, currency, avg_price AS start_price,
+               depot_info, image_path, variant_count
+        FROM inventory_groups
+        {cursor_sql}
+        ORDER BY min_id {order}
+        LIMIT ?
+    """
+    return sql, tuple(params)
+
+
+def ensure_image_manifest(conn):
+    """Resim dosyalarının varlık/boyut/tarih bilgisini tutan image_manifest tablosunu oluşturur"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_manifest (
+            image_path TEXT PRIMARY KEY,
+            present INTEGER NOT NULL DEFAULT 0,
+            resolved_path TEXT,
+            size INTEGER,
+            mtime REAL,
+            checked_at TEXT
+        )
+    """)
+    conn.commit()
+
+
+def _stat_image(image_path, upload_folder=None):
+    """Dosyayı kontrol eder: (present, resolved_path, size, mtime) döndürür
+
+    present sadece kayıtlı yolun kendisi için geçerlidir; resolved_path ise
+    dosya eski formatta kaydedildiyse upload klasöründeki karşılığını da gösterir.
+    """
+    candidates = [image_path]
+    if upload_folder:
+        candidates.append(os.path.join(upload_folder, os.path.basename(image_path)))
+    for candidate in candidates:
+        try:
+            stat = os.stat(candidate)
+        except OSError:
+            continue
+        return candidate == image_path, candidate, stat.st_size, stat.st_mtime
+    return False, None, None, None
+
+
+def utc_now():
+    """Şu anki UTC zamanı, saat dilimi eki olmadan ISO biçiminde (kayıtlı değerlerle aynı biçim)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def record_image(conn, image_path, upload_folder=None):
+    """Bir resmin manifest kaydını dosya sisteminden günceller (commit çağırana aittir)"""
+    if not image_path:
+        return None
+    present, resolved_path, size, mtime = _stat_image(image_path, upload_folder)
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO image_manifest (image_path, present, resolved_path, size, mtime, checked_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (image_path, int(present), resolved_path, size, mtime, utc_now()),
+    )
+    return resolved_path
+
+
+def image_presence(conn, image_paths, upload_folder=None):
+    """Verilen yollar için {image_path: resolved_path veya None} döndürür
+
+    Sadece okur: manifest'te olmayan yollar dosya sisteminden kontrol edilir ama
+    kaydedilmez - istek işleyicileri yazmaz, manifest'i arka plandaki eşitleyici tamamlar.
+    """
+    paths = list({path for path in image_paths if path})
+    result = {}
+    for start in range(0, len(paths), 500):
+        chunk = paths[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        rows = conn.execute(
+            f"SELECT image_path, resolved_path FROM image_manifest WHERE image_path IN ({placeholders})",
+            chunk,
+        ).fetchall()
+        result.update({row[0]: row[1] for row in rows})
+
+    for path in paths:
+        if path not in result:
+            result[path] = _stat_image(path, upload_folder)[1]
+    return result
+
+
+def record_unknown_images(conn, upload_folder=None):
+    """inventory'de olup manifest'te olmayan resim yollarını kontrol edip kaydeder"""
+    rows = conn.execute("""
+        SELECT DISTINCT inventory.image_path
+        FROM inventory
+        LEFT JOIN image_manifest ON image_manifest.image_path = inventory.image_path
+        WHERE inventory.image_path IS NOT NULL AND inventory.image_path != ''
+          AND image_manifest.image_path IS NULL
+    """).fetchall()
+    for row in rows:
+        record_image(conn, row[0], upload_folder)
+    if rows:
+        conn.commit()
+    return len(rows)
+
+
+def reconcile_images(conn, upload_folder=None, batch_size=500):
+    """Manifest'i dosya sistemiyle karşılaştırır: yeni yolları ekler, değişenleri günceller"""
+    record_unknown_images(conn, upload_folder)
+
+    # Artık hiçbir ürünün kullanmadığı kayıtları temizle
+    conn.execute("""
+        DELETE FROM image_manifest
+        WHERE image_path NOT IN (SELECT image_path FROM inventory WHERE image_path IS NOT NULL)
+    """)
+    conn.commit()
+
+    changed = 0
+    last_path = ""
+    while True:
+        rows = conn.execute(
+            """
+            SELECT image_path, present, resolved_path, size, mtime FROM image_manifest
+            WHERE image_path > ? ORDER BY image_path LIMIT ?
+            """,
+            (last_path, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        for image_path, present, resolved_path, size, mtime in rows:
+            current = _stat_image(image_path, upload_folder)
+            if (bool(present), resolved_path, size, mtime) != current:
+                record_image(conn, image_path, upload_folder)
+                changed += 1
+        # Her partide commit - diğer süreçleri uzun süre kilitlememek için
+        conn.commit()
+        last_path = rows[-1][0]
+    return changed
+
+
+def start_image_reconciler(database, upload_folder=None, interval=600):
+    """Manifest'i belirli aralıklarla dosya sistemiyle eşitleyen arka plan thread'ini başlatır"""
+    def worker():
+        while True:
+            try:
+                conn = connect(database)
+                try:
+                    changed = reconcile_images(conn, upload_folder)
+                finally:
+                    conn.close()
+                if changed:
+                    print(f"Resim manifest'i güncellendi: {changed} kayıt")
+            except Exception as e:
+                print(f"Resim manifest eşitleme hatası: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=worker, name="image-reconciler", daemon=True)
+    thread.start()
+    return thread
+
+
+# Değişiklik sayacı - inventory tablosundaki her ekleme/güncelleme/silmede artar.
+# PRAGMA data_version bağlantıya özeldir (havuzdaki bağlantılar arasında karşılaştırılamaz),
+# bu sayaç ise tüm süreçler için ortaktır.
+VERSION_TRIGGERS = {
+    f"inventory_version_{suffix}": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_version_{suffix} AFTER {event} ON inventory BEGIN
+            UPDATE inventory_version SET version = version + 1 WHERE id = 1;
+        END
+    """
+    for suffix, event in (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE"))
+}
+
+
+def ensure_version(conn):
+    """Değişiklik sayacı tablosunu ve trigger'larını oluşturur"""
+    if not _table_exists(conn, "inventory"):
+        return False
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO inventory_version (id, version) VALUES (1, 0)")
+    if _create_missing_triggers(conn, VERSION_TRIGGERS):
+        # Trigger'lar yoktu (ör. tablo to_sql ile değiştirildi) - aradaki değişiklikler sayılmadı
+        conn.execute("UPDATE inventory_version SET version = version + 1 WHERE id = 1")
+    conn.commit()
+    return True
+
+
+def get_version(conn):
+    """inventory tablosunun değişiklik sayacını döndürür (sayaç henüz kurulmadıysa None)"""
+    try:
+        row = conn.execute("SELECT version FROM inventory_version WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+# Değişiklik sırası - her ekleme/güncelleme/silme inventory_change_seq sayacını artırır ve satıra
+# (silmede tombstone'a) change_seq olarak yazar. Sayaç sadece yazma kilidi tutulurken artırılır; SQLite'ta
+# tek yazıcı olduğundan sıra numaraları commit sırasıyla aynıdır. Commit edilmemiş bir transaction'ın
+# satırları, okuma anında görünen en büyük sıradan daha büyük numara alır - uzun süren içe aktarmalar
+# da senkronda kaybolmaz. updated_at sadece bilgi amaçlıdır, senkron imleci olarak kullanılmaz.
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+_NEXT_SEQ_SQL = "UPDATE inventory_change_seq SET seq = seq + 1 WHERE id = 1;"
+_SEQ_SQL = "(SELECT seq FROM inventory_change_seq WHERE id = 1)"
+CHANGE_TRIGGERS = {
+    "inventory_change_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_change_ai AFTER INSERT ON inventory BEGIN
+            {_NEXT_SEQ_SQL}
+            UPDATE inventory SET updated_at = COALESCE(new.updated_at, {_NOW_SQL}), change_seq = {_SEQ_SQL}
+            WHERE rowid = new.rowid;
+        END
+    """,
+    # Trigger'ın kendi güncellemesi change_seq'i değiştirdiği için tekrar tetiklenmez
+    "inventory_change_au": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_change_au AFTER UPDATE ON inventory
+        WHEN new.change_seq IS old.change_seq BEGIN
+            {_NEXT_SEQ_SQL}
+            UPDATE inventory
+            SET updated_at = CASE WHEN new.updated_at IS old.updated_at THEN {_NOW_SQL} ELSE new.updated_at END,
+                change_seq = {_SEQ_SQL}
+            WHERE rowid = new.rowid;
+        END
+    """,
+}
+# Senkronun iç sütunları - imleç yanıtta ayrıca döndüğü için API ve dışa aktarmalarda gösterilmez
+INTERNAL_COLUMNS = ("change_seq",)
+# Zaman damgalı imleç kullanan önceki sürümün trigger'ları
+_LEGACY_CHANGE_TRIGGERS = ("inventory_touch_ai", "inventory_touch_au", "inventory_tombstone_ad")
+
+
+def _ensure_change_seq_table(conn):
+    """Değişiklik sırası sayacı; compacted_seq, silme kayıtları temizlenen en büyük sıradır"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_change_seq (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER NOT NULL DEFAULT 0,
+            compacted_seq INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO inventory_change_seq (id, seq, compacted_seq) VALUES (1, 0, 0)")
+    for name in _LEGACY_CHANGE_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def _add_column(conn, table, column, declared):
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declared}")
+
+
+def _number_missing_seqs(conn, table, order_by):
+    """change_seq'i olmayan (eski) kayıtlara sayaçtan sırayla numara verir"""
+    rowids = [row[0] for row in conn.execute(
+        f"SELECT rowid FROM {table} WHERE change_seq IS NULL ORDER BY {order_by}"
+    )]
+    if not rowids:
+        return
+    start = conn.execute(f"SELECT {_SEQ_SQL}").fetchone()[0]
+    conn.executemany(
+        f"UPDATE {table} SET change_seq = ? WHERE rowid = ?",
+        ((start + offset, rowid) for offset, rowid in enumerate(rowids, start=1)),
+    )
+    conn.execute("UPDATE inventory_change_seq SET seq = ? WHERE id = 1", (start + len(rowids),))
+
+
+def ensure_change_tracking(conn):
+    """updated_at ve change_seq sütunlarını, sıra sayacını, indeksleri ve trigger'ları hazırlar"""
+    if not _table_exists(conn, "inventory"):
+        return False
+
+    _add_column(conn, "inventory", "updated_at", "TEXT")
+    _add_column(conn, "inventory", "change_seq", "INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_updated_at ON inventory(updated_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_change_seq ON inventory(change_seq)")
+    _ensure_change_seq_table(conn)
+    _create_missing_triggers(conn, CHANGE_TRIGGERS)
+    conn.execute("UPDATE inventory SET updated_at = '1970-01-01T00:00:00' WHERE updated_at IS NULL")
+    # Sırası olmayan eski kayıtlar numaralanır, ilk tam senkronda gönderilir
+    _number_missing_seqs(conn, "inventory", "updated_at, id")
+    conn.commit()
+    return True
+
+
+def current_change_seq(conn):
+    """Okuma anında görünen en büyük değişiklik sırası (sayaç henüz kurulmadıysa 0)"""
+    try:
+        row = conn.execute(f"SELECT {_SEQ_SQL}").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def parse_change_token(token):
+    """Senkron imlecini (değişiklik sırası) çözer; imleç yoksa None, geçersizse ValueError
+
+    Önceki sürümün zaman damgalı imleçleri (updated_at veya updated_at|id) -1 olur;
+    deletions_since bunlar için tam senkron ister.
+    """
+    if not token:
+        return None
+    if token.isdigit():
+        return int(token)
+    datetime.fromisoformat(token.partition("|")[0])  # Eski biçim değilse ValueError
+    return -1
+
+
+def changes_query(columns, since=None, limit=500):
+    """since imlecinden sonra değişen kayıtlar için sorgu ve parametreler (change_seq sırasında)
+
+    Seçilen sütunlardan sonra change_seq son sütun olarak eklenir (next_change_token için).
+    Sütun adları çağıran tarafından tablo şemasına karşı doğrulanmış olmalıdır.
+    """
+    seq = parse_change_token(since)
+    where, params = "", []
+    if seq is not None:
+        where, params = "WHERE change_seq > ?", [seq]
+    select = ", ".join(f'"{column}"' for column in columns)
+    sql = f"SELECT {select}, change_seq FROM inventory {where} ORDER BY change_seq LIMIT ?"
+    return sql, params + [limit + 1]
+
+
+def page_query(columns, cursor=None, limit=100):
+    """id sırasında sayfalı liste sorgusu (keyset); cursor önceki sayfanın son id'sidir
+
+    Sütun adları çağıran tarafından tablo şemasına karşı doğrulanmış olmalıdır.
+    OFFSET kullanılmaz - her sayfa id indeksinden doğrudan başlar.
+    """
+    select = ", ".join(f'"{column}"' for column in columns)
+    where, params = "", []
+    if cursor:
+        where, params = "WHERE id > ?", [int(cursor)]
+    return f"SELECT {select} FROM inventory {where} ORDER BY id LIMIT ?", params + [limit + 1]
+
+
+def next_change_token(rows, has_more, read_seq):
+    """Bir sonraki senkron imleci: sayfa devam ediyorsa son satırın sırası, bittiyse okuma anının sırası
+
+    read_seq (current_change_seq) satırlarla aynı okuma transaction'ında alınmalıdır.
+    """
+    if has_more:
+        return str(rows[-1]["change_seq"])
+    return str(read_seq)
+
+
+# Silinen kayıtlar (tombstone) - istemciler silmeleri tam senkron yapmadan öğrenir
+TOMBSTONE_RETENTION_DAYS = 30
+TOMBSTONE_COMPACT_INTERVAL = 3600  # saniye
+TOMBSTONE_TRIGGERS = {
+    "inventory_tombstone_seq_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_tombstone_seq_ad AFTER DELETE ON inventory
+        WHEN old.id IS NOT NULL BEGIN
+            {_NEXT_SEQ_SQL}
+            INSERT OR REPLACE INTO inventory_tombstones (id, item_number, deleted_at, change_seq)
+            VALUES (old.id, old.item_number, {_NOW_SQL}, {_SEQ_SQL});
+        END
+    """,
+    # Aynı id tekrar kullanılırsa eski silme kaydı geçersizdir
+    "inventory_tombstone_ai": """
+        CREATE TRIGGER IF NOT EXISTS inventory_tombstone_ai AFTER INSERT ON inventory
+        WHEN new.id IS NOT NULL BEGIN
+            DELETE FROM inventory_tombstones WHERE id = new.id;
+        END
+    """,
+}
+
+_last_compaction = 0.0
+
+
+def ensure_tombstones(conn):
+    """Silme kaydı tablosunu ve trigger'larını oluşturur, süresi dolan kayıtları temizler"""
+    if not _table_exists(conn, "inventory"):
+        return False
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_tombstones (
+            id INTEGER PRIMARY KEY,
+            item_number TEXT,
+            deleted_at TEXT NOT NULL,
+            change_seq INTEGER
+        )
+    """)
+    _add_column(conn, "inventory_tombstones", "change_seq", "INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_tombstones_deleted_at ON inventory_tombstones(deleted_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_tombstones_change_seq ON inventory_tombstones(change_seq)")
+    _ensure_change_seq_table(conn)
+    # Sırası olmayan silme kayıtları zaman damgalı imleçlere aitti; o imleçler tam senkrona döner
+    conn.execute("DELETE FROM inventory_tombstones WHERE change_seq IS NULL")
+    _create_missing_triggers(conn, TOMBSTONE_TRIGGERS)
+    conn.commit()
+    compact_tombstones(conn)
+    return True
+
+
+def tombstone_horizon(retention_days=TOMBSTONE_RETENTION_DAYS):
+    """Bu zamandan eski silme kayıtları tutulmaz (trigger'ların yazdığı deleted_at biçiminde)"""
+    horizon = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    return horizon.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+
+
+def compact_tombstones(conn, retention_days=TOMBSTONE_RETENTION_DAYS):
+    """Saklama süresini aşan silme kayıtlarını (ve batch işlem günlüğünü) siler"""
+    global _last_compaction
+    _last_compaction = time.time()
+    horizon = tombstone_horizon(retention_days)
+    # Silinen en büyük sıra saklanır; bundan eski imleçler artık tüm silmeleri göremez
+    conn.execute("""
+        UPDATE inventory_change_seq
+        SET compacted_seq = MAX(compacted_seq, COALESCE(
+            (SELECT MAX(change_seq) FROM inventory_tombstones WHERE deleted_at < ?), 0))
+        WHERE id = 1
+    """, (horizon,))
+    removed = conn.execute("DELETE FROM inventory_tombstones WHERE deleted_at < ?", (horizon,)).rowcount
+    if _table_exists(conn, "batch_ops"):
+        conn.execute("DELETE FROM batch_ops WHERE applied_at < ?", (horizon,))
+    conn.commit()
+    return removed
+
+
+def maybe_compact_tombstones(conn):
+    """Temizliği en fazla TOMBSTONE_COMPACT_INTERVAL'da bir çalıştırır"""
+    if time.time() - _last_compaction >= TOMBSTONE_COMPACT_INTERVAL:
+        return compact_tombstones(conn)
+    return 0
+
+
+def deletions_since(conn, since, until=None):
+    """since imlecinden sonra (until dahil) silinen kayıtların id listesi (imleç yoksa boş)
+
+    İmleç saklama süresi dolup temizlenen silme kayıtlarından eskiyse None döner -
+    istemci tam senkron yapmalıdır.
+    """
+    seq = parse_change_token(since)
+    if seq is None:
+        return []
+    compacted = conn.execute("SELECT compacted_seq FROM inventory_change_seq WHERE id = 1").fetchone()
+    if seq < (compacted[0] if compacted else 0):
+        return None
+    where, params = "change_seq > ?", [seq]
+    if until is not None:
+        where += " AND change_seq <= ?"
+        params.append(int(until))
+    rows = conn.execute(f"SELECT id FROM inventory_tombstones WHERE {where} ORDER BY change_seq", params)
+    return [row[0] for row in rows]
+
+
+def ensure_batch_log(conn):
+    """POST /batch için uygulanmış işlem günlüğü (istemci op_id -> sonuç), tekrar denemeleri tekilleştirir"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS batch_ops (
+            op_id TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Sürümlü şema geçişleri (PRAGMA user_version) - her geçiş veritabanı başına bir kez çalışır
+# ---------------------------------------------------------------------------
+
+# inventory tablosunun olması gereken sütun tipleri (id, rowid'in kendisidir)
+INVENTORY_COLUMNS = (
+    ("id", "INTEGER PRIMARY KEY"),
+    ("item_number", "TEXT"),
+    ("title", "TEXT"),
+    ("variation_details", "TEXT"),
+    ("available_quantity", "INTEGER"),
+    ("currency", "TEXT"),
+    ("start_price", "REAL"),
+    ("depot_info", "TEXT"),
+    ("image_path", "TEXT"),
+    ("updated_at", "TEXT"),
+    ("change_seq", "INTEGER"),
+)
+
+
+def create_inventory_table(conn):
+    """inventory tablosunu (yoksa) doğru sütun tipleriyle oluşturur"""
+    definitions = ", ".join(f'"{name}" {declared}' for name, declared in INVENTORY_COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS inventory ({definitions})")
+
+
+def to_integer(value):
+    """Tam sayıya çevirir ('304.0', 304.0 -> 304); boş, NaN veya kesirli değerler için None"""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if number != number or number in (float("inf"), float("-inf")) or number != int(number):
+        return None
+    return int(number)
+
+
+def to_real(value):
+    """Ondalık sayıya çevirir ('12.50' -> 12.5); boş veya NaN için None, sayı değilse olduğu gibi"""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return None if number != number else number
+
+
+def import_id_normalizer(conn, append=False):
+    """İçe aktarılan id'ler için dönüştürücü: geçerli id'ler tam sayı olur; boş, bozuk, tabloda
+    veya dosyada tekrarlanan id'lere kullanılmayan bir sonraki id verilir
+
+    Okunan id kümesinin değişmemesi için çağıran yazma kilidini (BEGIN IMMEDIATE) tutmalıdır.
+    """
+    taken = {row[0] for row in conn.execute("SELECT id FROM inventory")} if append else set()
+    next_id = max(taken, default=0) + 1
+
+    def normalize(value):
+        nonlocal next_id
+        item_id = to_integer(value)
+        if item_id is None or item_id <= 0 or item_id in taken:
+            while next_id in taken:
+                next_id += 1
+            item_id = next_id
+        taken.add(item_id)
+        return item_id
+
+    return normalize
+
+
+def _id_is_primary_key(conn):
+    columns = conn.execute("PRAGMA table_info(inventory)").fetchall()
+    primary = [column for column in columns if column[5]]
+    return len(primary) == 1 and primary[0][1] == "id" and primary[0][2].upper() == "INTEGER"
+
+
+def _migrate_integer_ids(conn):
+    """1: id sütununu INTEGER PRIMARY KEY yapar
+
+    pandas to_sql ile yüklenen tablolarda id REAL/TEXT ('304.0'), NaN veya tekrarlı olabilir.
+    Geçerli id'ler tam sayıya çevrilir; boş, bozuk veya tekrarlı olanlara en büyük id'den
+    sonraki numaralar verilir (bu satırların updated_at'ı yenilenir, mobil istemciler senkronlar).
+    Tablo yeniden oluşturulduğu için trigger'lar kaybolur; ensure_schema hepsini ve
+    türetilmiş tabloları yeniden kurar.
+    """
+    if _id_is_primary_key(conn):
+        return
+
+    existing = [(row[1], row[2]) for row in conn.execute("PRAGMA table_info(inventory)")]
+    names = {name for name, _ in existing}
+    known = dict(INVENTORY_COLUMNS)
+    # Bilinen sütunlar doğru tipleriyle, tablodaki ek sütunlar olduğu gibi taşınır
+    definitions = [f'"{name}" {declared}' for name, declared in INVENTORY_COLUMNS]
+    definitions += [f'"{name}" {declared}' for name, declared in existing if name not in known]
+    copied = [name for name, _ in existing if name != "id"]
+
+    assigned = {}
+    invalid = []
+    rows = conn.execute(f"SELECT rowid, {'id' if 'id' in names else 'NULL'} FROM inventory ORDER BY rowid")
+    for rowid, value in rows:
+        item_id = to_integer(value)
+        if item_id is None or item_id <= 0 or item_id in assigned:
+            invalid.append(rowid)
+        else:
+            assigned[item_id] = rowid
+    next_id = max(assigned, default=0) + 1
+    id_map = [(rowid, item_id, 0) for item_id, rowid in assigned.items()]
+    id_map += [(rowid, next_id + offset, 1) for offset, rowid in enumerate(invalid)]
+
+    conn.execute("DROP TABLE IF EXISTS inventory_migrated")
+    conn.execute(f"CREATE TABLE inventory_migrated ({', '.join(definitions)})")
+    conn.execute("CREATE TEMP TABLE inventory_id_map (old_rowid INTEGER PRIMARY KEY, new_id INTEGER, changed INTEGER)")
+    conn.executemany("INSERT INTO inventory_id_map VALUES (?, ?, ?)", id_map)
+    # id'si değişen satırlar yeniden damgalanır; change_seq'leri ensure_change_tracking'de yeniden verilir
+    stamped = {
+        "updated_at": f"CASE WHEN m.changed THEN {_NOW_SQL} ELSE i.updated_at END",
+        "change_seq": "CASE WHEN m.changed THEN NULL ELSE i.change_seq END",
+    }
+    select = [stamped.get(name, f'i."{name}"') for name in copied]
+    column_list = ", ".join(f'"{name}"' for name in copied)
+    conn.execute(f"""
+        INSERT INTO inventory_migrated (id{', ' if copied else ''}{column_list})
+        SELECT m.new_id{', ' if copied else ''}{', '.join(select)}
+        FROM inventory AS i JOIN inventory_id_map AS m ON m.old_rowid = i.rowid
+    """)
+    conn.execute("DROP TABLE inventory_id_map")
+    conn.execute("DROP TABLE inventory")
+    conn.execute("ALTER TABLE inventory_migrated RENAME TO inventory")
+    print(f"inventory.id INTEGER PRIMARY KEY yapıldı ({len(invalid)} satıra yeni id verildi)")
+
+
+# Sıra önemlidir - user_version, uygulanan son geçişin numarasıdır
+MIGRATIONS = (
+    _migrate_integer_ids,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Uygulanmamış şema geçişlerini sırayla ve her birini tek transaction'da çalıştırır
+
+    Geçişler (ve ensure_* fonksiyonları) commit ettiği için açık bir transaction içinde
+    çağrılamaz - çağıranın yarım işi habersizce commit edilmesin diye RuntimeError fırlatır.
+    """
+    if conn.in_transaction:
+        raise RuntimeError("Şema geçişleri açık bir transaction içinde çalıştırılamaz")
+    if not _table_exists(conn, "inventory"):
+        return
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def ensure_schema(conn):
+    """Şema geçişlerini uygular, tüm türetilmiş tabloları (arama indeksi, sayaçlar, gruplar,
+    resim manifest'i, sürüm, senkron ve batch günlüğü) hazırlar"""
+    migrate(conn)
+    ensure_search_index(conn)
+    ensure_stats(conn)
+    ensure_groups(conn)
+    ensure_image_manifest(conn)
+    ensure_version(conn)
+    ensure_change_tracking(conn)
+    ensure_tombstones(conn)
+    ensure_batch_log(conn)
+
+
+def fts_match_query(search_term):
+    """Kullanıcının arama metnini önek eşleşmeli bir FTS5 MATCH ifadesine çevirir"""
+    tokens = re.findall(r"\w+", search_term or "", re.UNICODE)
+    if not tokens:
+        return None
+    # Her kelime tırnak içinde ve önek (*) olarak aranır, kelimeler arasında AND
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _use_fts(conn, search_term):
+    if not FTS5_AVAILABLE:
+        return None
+    match_query = fts_match_query(search_term)
+    if match_query and _table_exists(conn, "inventory_fts"):
+        return match_query
+    return None
+
+
+def search_condition(conn, search_term, rowid_column="inventory.rowid"):
+    """Arama için WHERE koşulunu ve parametrelerini döndürür (FTS yoksa LIKE'a düşer)"""
+    match_query = _use_fts(conn, search_term)
+    if match_query:
+        return (
+            f"{rowid_column} IN (SELECT rowid FROM inventory_fts WHERE inventory_fts MATCH ?)",
+            (match_query,),
+        )
+    like = f"%{search_term}%"
+    return "(item_number LIKE ? OR title LIKE ? OR variation_details LIKE ?)", (like, like, like)
+
+
+# Alaka (bm25) sıralaması en yeni bu kadar eşleşme içinde yapılır; daha eski eşleşmeler
+# rowid sırasıyla arkadan gelir. Böylece sayfa maliyeti eşleşme sayısına değil bu sınıra bağlıdır.
+SEARCH_RANK_CANDIDATES = 1000
+
+
+def ranked_search_query(conn, search_term, columns, after=None, limit=None):
+    """Alaka sırasına (bm25) göre sıralı arama sorgusu ve parametrelerini döndürür
+
+    Sadece en yeni SEARCH_RANK_CANDIDATES eşleşme alaka sırasına konur; geri kalanı onlardan
+    sonra rowid sırasıyla (search_rank NULL) listelenir. Sonuçlara search_rank ve search_rowid
+    sütunları eklenir; bir sonraki sayfa için after=(search_rank, search_rowid) imleci olarak
+    geri verilebilir.
+    """
+    match_query = _use_fts(conn, search_term)
+    after_rank, after_rowid = after if after else (None, None)
+
+    if match_query:
+        # Her iki bölüm de en fazla limit satır üretir - dış sıralama küçük bir küme üzerinde
+        inner_limit = "LIMIT ?" if limit is not None else ""
+        inner_params = [limit] if limit is not None else []
+        ranked_filter, ranked_params = "", []
+        tail_filter, tail_params = "", []
+        if after_rowid is not None and after_rank is not None:
+            # Keyset: (rank, rowid) sıralamasında imleçten sonraki kayıtlar
+            ranked_filter = "WHERE fts_rank > ? OR (fts_rank = ? AND fts_rowid < ?)"
+            ranked_params = [after_rank, after_rank, after_rowid]
+        elif after_rowid is not None:
+            # Alaka sıralı bölüm bitti - imleç rowid sıralı kuyruktadır
+            ranked_filter = "WHERE 0"
+            tail_filter, tail_params = "AND rowid < ?", [after_rowid]
+        params = (
+            [match_query, SEARCH_RANK_CANDIDATES] + ranked_params + inner_params
+            + [match_query] + tail_params + inner_params
+        )
+        sql = f"""
+            WITH candidates AS (
+                SELECT rowid AS fts_rowid, bm25(inventory_fts, 10.0, 5.0, 1.0) AS fts_rank
+                FROM inventory_fts
+                WHERE inventory_fts MATCH ?
+                ORDER BY rowid DESC
+                LIMIT ?
+            ),
+            ranked AS (
+                SELECT fts_rowid, fts_rank FROM candidates
+                {ranked_filter}
+                ORDER BY fts_rank, fts_rowid DESC
+                {inner_limit}
+            ),
+            tail AS (
+                SELECT rowid AS fts_rowid, NULL AS fts_rank
+                FROM inventory_fts
+                WHERE inventory_fts MATCH ? AND rowid < (SELECT MIN(fts_rowid) FROM candidates) {tail_filter}
+                ORDER BY rowid DESC
+                {inner_limit}
+            )
+            SELECT {columns}, matches.fts_rank AS search_rank, inventory.rowid AS search_rowid
+            FROM inventory
+            JOIN (
+                SELECT fts_rowid, fts_rank, 0 AS phase FROM ranked
+                UNION ALL
+                SELECT fts_rowid, fts_rank, 1 AS phase FROM tail
+            ) AS matches ON matches.fts_rowid = inventory.rowid
+            ORDER BY matches.phase, matches.fts_rank, inventory.rowid DESC
+        """
+    else:
+        condition, params = search_condition(conn, search_term)
+        params = list(params)
+        if after_rowid is not None:
+            condition += " AND inventory.rowid < ?"
+            params.append(after_rowid)
+        sql = f"""
+            SELECT {columns}, NULL AS search_rank, inventory.rowid AS search_rowid
+            FROM inventory
+            WHERE {condition}
+            ORDER BY inventory.rowid DESC
+        """
+
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, tuple(params)
@@ -0,0 +1,492 @@
+"""
+Envanter dışa aktarma yardımcıları
+Satırlar veritabanı imlecinden parça parça okunur, tüm tablo hiçbir zaman belleğe alınmaz
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import queue
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+
+import inventory_db
+
+# openpyxl import (opsiyonel - Excel dışa aktarma için)
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except Exception as openpyxl_error:
+    print(f"openpyxl yüklenemedi: {openpyxl_error}")
+    OPENPYXL_AVAILABLE = False
+    Workbook = None
+
+# pyarrow import (opsiyonel - Parquet/Arrow anlık görüntüleri için)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except Exception as pyarrow_error:
+    print(f"pyarrow yüklenemedi: {pyarrow_error}")
+    PYARROW_AVAILABLE = False
+    pa = None
+    pq = None
+
+CHUNK_SIZE = 1000
+# Bu kadar satırdan küçük eklemelerde türetilmiş tabloları baştan hesaplamak satır başına bakımdan pahalıdır
+BULK_LOAD_MIN_ROWS = 5000
+
+# Web dışa aktarmasının sütunları (sırasıyla)
+EXPORT_COLUMNS = [
+    "id", "item_number", "title", "variation_details", "available_quantity",
+    "currency", "start_price", "depot_info", "image_path",
+]
+
+
+class ExportCancelled(Exception):
+    """Dışa aktarma kullanıcı veya istemci tarafından iptal edildi"""
+
+
+def iter_rows(cursor, chunk_size=CHUNK_SIZE):
+    """İmleçten satırları fetchmany ile parça parça döndürür"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def table_columns(conn):
+    """inventory tablosunun sütun adları (şema giriş noktasına göre farklı olabilir)"""
+    return [row[1] for row in conn.execute("PRAGMA table_info(inventory)")]
+
+
+def public_columns(conn):
+    """Yanıtlarda gösterilen sütunlar (senkronun iç sütunları hariç)"""
+    return [column for column in table_columns(conn) if column not in inventory_db.INTERNAL_COLUMNS]
+
+
+def parse_columns(conn, requested, default=None):
+    """?columns=a,b,c parametresini doğrular; bilinmeyen sütunda ValueError fırlatır"""
+    available = public_columns(conn)
+    if not requested:
+        return [column for column in default if column in available] if default else available
+    columns = [column.strip() for column in requested.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Bilinmeyen sütun: {', '.join(unknown)}")
+    return columns
+
+
+def export_query(conn, columns, depot=None, search=None, order_by="id DESC"):
+    """Seçili sütunlar ve depo/arama filtreleriyle dışa aktarma sorgusu ve parametreleri"""
+    conditions = []
+    params = []
+    if depot:
+        conditions.append("depot_info = ?")
+        params.append(depot)
+    if search:
+        condition, search_params = inventory_db.search_condition(conn, search)
+        conditions.append(condition)
+        params.extend(search_params)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Sütun adları parse_columns ile tablo şemasına karşı doğrulanmıştır
+    select = ", ".join(f'"{column}"' for column in columns)
+    return f"SELECT {select} FROM inventory {where} ORDER BY {order_by}", params
+
+
+def iter_csv(cursor, columns, chunk_size=CHUNK_SIZE):
+    """İmleçteki satırları CSV olarak parça parça (bytes) döndürür"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if rows:
+            writer.writerows(rows)
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if not rows:
+            break
+
+
+def iter_ndjson(cursor, columns, chunk_size=CHUNK_SIZE):
+    """İmleçteki satırları her satırda bir JSON nesnesi olarak parça parça (bytes) döndürür"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+def write_xlsx(fileobj, header, rows, sheet_name="Envanter", progress=None, cancel_event=None):
+    """Satırları write-only çalışma kitabına yazar; fileobj dosya yolu veya yazılabilir nesne olabilir
+
+    Write-only modda satırlar hücre nesnesi olarak bellekte tutulmaz.
+    progress(yazılan_satır) her CHUNK_SIZE satırda bir çağrılır.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(header)
+    count = 0
+    for row in rows:
+        sheet.append(list(row))
+        count += 1
+        if count % CHUNK_SIZE == 0:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            if progress:
+                progress(count)
+    workbook.save(fileobj)
+    if progress:
+        progress(count)
+    return count
+
+
+class _QueueWriter:
+    """Çıktıyı parçalar halinde kuyruğa yazan, geri sarılamayan dosya nesnesi
+
+    Write-only çalışma kitabı satırları önce openpyxl'in kendi geçici dosyasına yazar,
+    zip çıktısı save() sırasında üretilir; bu geçici dosya save() sonunda silinir.
+    """
+
+    closed = False
+
+    def __init__(self, chunks, cancel_event):
+        self._chunks = chunks
+        self._cancel_event = cancel_event
+        self._position = 0
+
+    def write(self, data):
+        self._position += len(data)
+        while True:
+            if self._cancel_event.is_set():
+                # İstemci gitti - dosyanın yarıda bırakılmaması için kalan çıktı atılır
+                return len(data)
+            try:
+                self._chunks.put(bytes(data), timeout=0.5)
+                return len(data)
+            except queue.Full:
+                continue
+
+    def tell(self):
+        # Parquet yazıcısı ofsetleri tell() ile hesaplar; zipfile seek() olmadığını görüp akış moduna geçer
+        return self._position
+
+    def flush(self):
+        pass
+
+
+def _stream_from_writer(write, name):
+    """write(dosya_nesnesi, cancel_event) çıktısını üretildikçe parça parça döndüren generator
+
+    write üretici thread'de çağrılır (veritabanı bağlantısı o thread'de açılmalıdır).
+    Kuyruk sınırlı olduğu için bellek kullanımı tablo boyutundan bağımsızdır;
+    istemci bağlantıyı keserse generator kapanır ve üretim durdurulur.
+    """
+    chunks = queue.Queue(maxsize=16)
+    cancel_event = threading.Event()
+    done = object()
+
+    def producer():
+        try:
+            write(_QueueWriter(chunks, cancel_event), cancel_event)
+            result = done
+        except ExportCancelled:
+            return
+        except Exception as e:
+            print(f"{name} hatası: {e}")
+            result = e
+        while not cancel_event.is_set():
+            try:
+                chunks.put(result, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    thread = threading.Thread(target=producer, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        cancel_event.set()
+
+
+def stream_xlsx(produce_rows, header, sheet_name="Envanter"):
+    """xlsx dosyasını üretildikçe parça parça döndüren generator
+
+    produce_rows() üretici thread'de çağrılır ve satır iterable'ı döndürmelidir.
+    """
+    def write(fileobj, cancel_event):
+        write_xlsx(fileobj, header, produce_rows(), sheet_name=sheet_name, cancel_event=cancel_event)
+
+    return _stream_from_writer(write, "Excel export")
+
+
+# ---------------------------------------------------------------------------
+# Sütunlu (Parquet / Arrow IPC) anlık görüntüler
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_BATCH_SIZE = 10000
+SNAPSHOT_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+# SQLite typeof() değerlerine göre sütun tipi: hepsi tam sayıysa int64, sayıysa float64, aksi halde metin
+_NUMERIC_TYPEOFS = {"int64": ("integer", "null"), "float64": ("integer", "real", "null")}
+
+
+def snapshot_format(path):
+    """Dosya uzantısından anlık görüntü biçimini döndürür (parquet/arrow), bilinmiyorsa None"""
+    return SNAPSHOT_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def snapshot_schema(conn, columns=None):
+    """Sütun tiplerini tablodaki gerçek değerlerden (typeof) belirleyip Arrow şeması döndürür"""
+    declared = {row[1]: (row[2] or "").upper() for row in conn.execute("PRAGMA table_info(inventory)")}
+    columns = columns or list(declared)
+    checks = []
+    for column in columns:
+        checks.append(f'COUNT("{column}")')
+        for typeofs in _NUMERIC_TYPEOFS.values():
+            allowed = ", ".join(f"'{name}'" for name in typeofs)
+            checks.append(f'COALESCE(SUM(typeof("{column}") NOT IN ({allowed})), 0)')
+    stats = conn.execute(f"SELECT {', '.join(checks)} FROM inventory").fetchone()
+
+    fields = []
+    for index, column in enumerate(columns):
+        non_null, int_mismatch, float_mismatch = stats[index * 3:index * 3 + 3]
+        if not non_null:
+            # Değer yoksa tanımlı sütun tipine göre karar ver
+            declared_type = declared.get(column, "")
+            int_mismatch = "INT" not in declared_type
+            float_mismatch = int_mismatch and not any(name in declared_type for name in ("REAL", "FLOA", "DOUB"))
+        if not int_mismatch:
+            arrow_type = pa.int64()
+        elif not float_mismatch:
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields, metadata={"inventory_snapshot": "1", "created_at": datetime.now().isoformat()})
+
+
+def _record_batch(rows, schema):
+    """Satırları Arrow RecordBatch'e çevirir; metin sütunlarındaki sayılar metne dönüştürülür"""
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_snapshot(conn, fileobj, fmt="parquet", progress=None, cancel_event=None):
+    """inventory tablosunu SNAPSHOT_BATCH_SIZE'lık partiler halinde Parquet/Arrow IPC olarak yazar"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow yüklü değil")
+    schema = snapshot_schema(conn)
+    select = ", ".join(f'"{field.name}"' for field in schema)
+    cursor = conn.execute(f"SELECT {select} FROM inventory ORDER BY rowid")
+
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(fileobj, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(fileobj, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    count = 0
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            rows = cursor.fetchmany(SNAPSHOT_BATCH_SIZE)
+            if not rows:
+                break
+            writer.write_batch(_record_batch(rows, schema))
+            count += len(rows)
+            if progress:
+                progress(count)
+    finally:
+        writer.close()
+    return count
+
+
+def stream_snapshot(connect, fmt="parquet"):
+    """Anlık görüntüyü üretildikçe parça parça döndüren generator; connect() üretici thread'de çağrılır"""
+    def write(fileobj, cancel_event):
+        conn = connect()
+        try:
+            write_snapshot(conn, fileobj, fmt, cancel_event=cancel_event)
+        finally:
+            conn.close()
+
+    return _stream_from_writer(write, "Snapshot export")
+
+
+def _iter_snapshot_batches(path):
+    if snapshot_format(path) == "parquet":
+        yield from pq.ParquetFile(path).iter_batches(batch_size=SNAPSHOT_BATCH_SIZE)
+    else:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
+
+
+def _prepare_schema(conn):
+    """Yüklemeden önce tabloyu, geçişleri ve türetilmiş tabloları hazırlar
+
+    ensure_* fonksiyonları kendi commit'lerini yaptığından yükleme transaction'ının dışında
+    çağrılır; böylece yükleme hatasında rollback gerçekten tüm satırları geri alır.
+    """
+    if not table_columns(conn):
+        inventory_db.create_inventory_table(conn)
+    inventory_db.ensure_schema(conn)
+
+
+def load_snapshot(conn, path, append=False, progress=None):
+    """Parquet/Arrow anlık görüntüsünü inventory tablosuna yükler (Excel yüklemesinin karşılığı)
+
+    append=False ise mevcut kayıtlar silinir. Sadece tabloda da bulunan sütunlar yüklenir;
+    tablo yoksa standart şemayla oluşturulur. Şema ve türetilmiş tablolar yüklemeden önce
+    hazırlanır (ensure_schema kendi commit'ini yapar); satırlar tek transaction'da yazılır,
+    hata olursa hiçbiri kalmaz.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow yüklü değil")
+    if snapshot_format(path) is None:
+        raise ValueError(f"Desteklenmeyen anlık görüntü biçimi: {path}")
+
+    if snapshot_format(path) == "parquet":
+        schema = pq.read_schema(path)
+    else:
+        with pa.memory_map(path) as source:
+            schema = pa.ipc.open_file(source).schema
+
+    _prepare_schema(conn)
+    existing = table_columns(conn)
+    columns = [name for name in schema.names if name in existing]
+    if "item_number" not in columns:
+        raise ValueError("Anlık görüntüde item_number sütunu yok")
+
+    indexes = [schema.names.index(name) for name in columns]
+    column_list = ", ".join(f'"{name}"' for name in columns)
+    insert_sql = f"INSERT INTO inventory ({column_list}) VALUES ({', '.join('?' * len(columns))})"
+    count = 0
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        # Arama indeksi, sayaçlar ve gruplar satır başına değil, yükleme sonunda bir kez hesaplanır
+        with inventory_db.bulk_load(conn):
+            if not append:
+                conn.execute("DELETE FROM inventory")
+            normalize_id = inventory_db.import_id_normalizer(conn, append)
+            for batch in _iter_snapshot_batches(path):
+                values = [batch.column(index).to_pylist() for index in indexes]
+                if "id" in columns:
+                    position = columns.index("id")
+                    values[position] = [normalize_id(value) for value in values[position]]
+                conn.executemany(insert_sql, zip(*values))
+                count += batch.num_rows
+                if progress:
+                    progress(count)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def _text(value):
+    if value is None or value != value:  # NaN
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Boş hücreli sayısal sütunlar pandas'ta float olur: 12345.0 -> "12345"
+    return str(value)
+
+
+_CONVERTERS = {"INTEGER": inventory_db.to_integer, "REAL": inventory_db.to_real, "TEXT": _text}
+
+
+def load_records(conn, columns, rows, append=False, progress=None):
+    """Satırları (ör. Excel'den okunan) sütun tiplerine çevirerek inventory tablosuna yazar
+
+    append=False ise mevcut kayıtlar silinir. id'ler tam sayıya çevrilir, çakışan veya boş
+    id'lere yeni id verilir; sayılar sayı, metinler metin olarak yazılır. Şema yüklemeden önce
+    hazırlanır (ensure_schema kendi commit'ini yapar); satırlar tek transaction'da yazılır.
+    progress(yazılan_satır, toplam) her CHUNK_SIZE satırda bir çağrılır; hata fırlatırsa
+    (ör. iptal) yükleme geri alınır. Yazılan satırların id listesini döndürür.
+    """
+    types = {name: declared.split()[0] for name, declared in inventory_db.INVENTORY_COLUMNS}
+    indexes = [index for index, column in enumerate(columns) if column in types and column != "id"]
+    if "item_number" not in columns:
+        raise ValueError("item_number sütunu yok")
+    id_index = columns.index("id") if "id" in columns else None
+    names = ["id"] + [columns[index] for index in indexes]
+    converters = [_CONVERTERS[types[columns[index]]] for index in indexes]
+
+    column_list = ", ".join(f'"{name}"' for name in names)
+    insert_sql = f"INSERT INTO inventory ({column_list}) VALUES ({', '.join('?' * len(names))})"
+    ids = []
+    _prepare_schema(conn)
+    try:
+        # id'ler okunan en büyük id'ye göre verilir - kilit baştan alınır
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        # Arama indeksi, sayaçlar ve gruplar satır başına değil, yükleme sonunda bir kez hesaplanır
+        bulk = not append or len(rows) >= BULK_LOAD_MIN_ROWS
+        with inventory_db.bulk_load(conn) if bulk else nullcontext():
+            if not append:
+                conn.execute("DELETE FROM inventory")
+            normalize_id = inventory_db.import_id_normalizer(conn, append)
+            for start in range(0, len(rows), CHUNK_SIZE):
+                values = []
+                for row in rows[start:start + CHUNK_SIZE]:
+                    item_id = normalize_id(row[id_index] if id_index is not None else None)
+                    ids.append(item_id)
+                    values.append((item_id,) + tuple(convert(row[index]) for convert, index in zip(converters, indexes)))
+                conn.executemany(insert_sql, values)
+                if progress:
+                    progress(len(ids), len(rows))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Envanter anlık görüntüsü (Parquet/Arrow IPC) al veya yükle")
+    parser.add_argument("--database", default="database.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = subparsers.add_parser("snapshot", help="inventory tablosunu dosyaya yaz")
+    snapshot_parser.add_argument("path", help="Hedef dosya (.parquet, .arrow veya .feather)")
+    load_parser = subparsers.add_parser("load", help="Anlık görüntüyü inventory tablosuna yükle")
+    load_parser.add_argument("path")
+    load_parser.add_argument("--append", action="store_true", help="Mevcut kayıtları silmeden ekle")
+    args = parser.parse_args()
+
+    if snapshot_format(args.path) is None:
+        parser.error("Dosya uzantısı .parquet, .arrow veya .feather olmalı")
+    db_conn = inventory_db.connect(args.database)
+    try:
+        if args.command == "snapshot":
+            with open(args.path, "wb") as output:
+                total = write_snapshot(db_conn, output, snapshot_format(args.path))
+            print(f"{total} kayıt yazıldı: {args.path}")
+        else:
+            total = load_snapshot(db_conn, args.path, append=args.append)
+            print(f"{total} kayıt yüklendi: {args.path}")
+    finally:
+        db_conn.close()
@@ -0,0 +1,274 @@
+"""
+Etiket (PDF) oluşturma motoru
+Fontlar bir kez kaydedilir, QR ve PDF tamamen bellekte üretilir;
+oluşturulan etiketler içerik özeti ve boyuta göre önbelleklenir
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from textwrap import wrap
+
+# PyInstaller için reportlab import'larını try-except ile sarmalayalım
+try:
+    from reportlab.pdfgen import canvas
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.lib.utils import ImageReader
+    try:
+        from reportlab.graphics.barcode import code128
+        BARCODE_AVAILABLE = True
+    except Exception as barcode_error:
+        print(f"Barcode modülü yüklenemedi: {barcode_error}")
+        BARCODE_AVAILABLE = False
+        code128 = None
+    REPORTLAB_AVAILABLE = True
+except Exception as reportlab_error:
+    print(f"ReportLab yüklenemedi: {reportlab_error}")
+    REPORTLAB_AVAILABLE = False
+    BARCODE_AVAILABLE = False
+    canvas = None
+    TTFont = None
+    pdfmetrics = None
+    ImageReader = None
+    code128 = None
+
+# QR Code import
+try:
+    import qrcode
+    QR_AVAILABLE = True
+except Exception as qr_error:
+    print(f"QRCode modülü yüklenemedi: {qr_error}")
+    QR_AVAILABLE = False
+    qrcode = None
+
+# 80 DPI için doğru ölçüler (piksel cinsinden)
+LABEL_SIZES = {"40x15": (126, 44), "40x20": (126, 60), "40x30": (126, 90)}
+DEFAULT_SIZE = "40x15"
+# Masaüstü uygulamasının etiket boyutu (40 mm genişlik)
+DESKTOP_LABEL_SIZE = (113, 80)
+# Tek istekte basılabilecek en fazla etiket (sayfa) sayısı
+MAX_BATCH_PAGES = 1000
+
+# Font adı -> dosya adı (fonts klasöründe)
+FONTS = {
+    "Roboto": "Roboto-Regular.ttf",
+    "Robotom": "Roboto-Bold.ttf",
+    "Oswald": "Oswald-Bold.ttf",
+}
+
+LABEL_CACHE_SIZE = 512
+
+_fonts_lock = threading.Lock()
+_fonts_registered = None  # None: henüz denenmedi, True/False: sonuç
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def register_fonts(font_dir):
+    """Etiket fontlarını reportlab'a bir kez kaydeder; başarılıysa True döner"""
+    global _fonts_registered
+    with _fonts_lock:
+        if _fonts_registered is not None:
+            return _fonts_registered
+        if not REPORTLAB_AVAILABLE:
+            _fonts_registered = False
+            return False
+        try:
+            for font_name, file_name in FONTS.items():
+                pdfmetrics.registerFont(TTFont(font_name, os.path.join(font_dir, file_name)))
+            _fonts_registered = True
+        except Exception as font_error:
+            print(f"Font yükleme hatası: {font_error}")
+            _fonts_registered = False
+        return _fonts_registered
+
+
+def label_font():
+    return "Oswald" if _fonts_registered else "Helvetica"
+
+
+def label_fields(item):
+    """Etikete basılan alanlar - önbellek anahtarı da bunlardan hesaplanır"""
+    return (
+        str(item["item_number"]),
+        item["title"] or "",
+        item["variation_details"] if item["variation_details"] else "N/A",
+        str(item["start_price"]),
+        item["currency"] or "",
+        item["depot_info"] or "",
+    )
+
+
+def content_hash(fields):
+    return hashlib.sha1("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def qr_png(data):
+    """QR kodunu bellekte PNG olarak üretir (aynı veri için önbellekten)"""
+    qr = qrcode.QRCode(box_size=2, border=1)
+    qr.add_data(data)
+    qr_img = qr.make_image(fill="black", back_color="white")
+    buffer = io.BytesIO()
+    qr_img.save(buffer)
+    return buffer.getvalue()
+
+
+def draw_label(c, fields, width, height):
+    """Tek bir etiketi verilen canvas'a çizer (sayfa/form içeriği olarak)"""
+    item_number, title, variation_details, start_price, currency, depot_info = fields
+    font_name = label_font()
+
+    # 1D Barkod
+    barcode = code128.Code128(item_number, barHeight=9, barWidth=0.7)
+    barcode.drawOn(c, -13, height - 9)
+
+    # Barkod altı yazı
+    c.setFont(font_name, 5)
+    text_x_position = -24 + (barcode.width / 2) - (len(item_number) + len(depot_info))
+    c.drawString(text_x_position, height - 14, f"{item_number} | {depot_info}")
+
+    # Ürün Adı - satırlara böl
+    c.setFont(font_name, 7)
+    y_position = height - 22
+    for line in wrap(title, width=24)[:2]:
+        c.drawString(5, y_position, line)
+        y_position -= 9
+
+    # Fiyat
+    c.setFont(font_name, 10)
+    c.drawString(15, y_position - 1, f"{start_price} {currency}")
+
+    # QR Kodu ekle (eğer mevcut ise)
+    if QR_AVAILABLE:
+        try:
+            qr_data = f"{item_number} | {title} | {variation_details}| {start_price} {currency} | {depot_info}"
+            c.drawImage(ImageReader(io.BytesIO(qr_png(qr_data))), width - 44, 2, width=44, height=43)
+        except Exception as qr_error:
+            print(f"QR kod oluşturma hatası: {qr_error}")
+
+
+def desktop_label_fields(item_values):
+    """Masaüstü TreeView satırından etikete basılan alanlar"""
+    return tuple(str(value) for value in item_values[1:8])
+
+
+def draw_desktop_label(c, fields, width, height):
+    """Masaüstü etiket düzeni (Helvetica, miktar bilgisi QR içinde)"""
+    item_number, title, variation_details, available_quantity, currency, start_price, depot_info = fields
+
+    # 1D Barkod (Item Number)
+    barcode = code128.Code128(item_number, barHeight=8, barWidth=0.6)  # Küçük boyutlu barkod
+    barcode_x = -12  # Barkodu sola hizala
+    barcode.drawOn(c, barcode_x, height - 9)
+    c.setFont("Helvetica", 3)
+    # Item Number (Barkodun tam altına ortalanmış)
+    text_x_position = barcode_x + (barcode.width / 2) - (len(item_number) + len(depot_info))
+    c.drawString(text_x_position, height - 12, f"{item_number} -- {depot_info}")
+
+    # Title (Satırlara bölerek sığdır - her satırda 20 karakter)
+    y_position = height - 20
+    c.setFont("Helvetica", 5)
+    for start in range(0, max(len(title), 1), 20):
+        c.drawString(5, y_position, title[start:start + 20])
+        y_position -= 10
+
+    # Variation Details
+    if variation_details:
+        c.drawString(5, y_position, variation_details)
+        y_position -= 10
+
+    # Price + Currency
+    c.setFont("Helvetica", 6)
+    c.drawString(15, y_position, f"{start_price} {currency}")
+
+    # QR Kod (sağda yer alacak)
+    if QR_AVAILABLE:
+        qr_data = (f"Item: {item_number}, Title: {title}, Variation: {variation_details}, "
+                   f"Quantity: {available_quantity}, Price: {start_price} {currency}, Depot: {depot_info}")
+        c.drawImage(ImageReader(io.BytesIO(qr_png(qr_data))), width - 48, 3, width=45, height=45)
+
+
+def _render_batch(entries, width, height, draw):
+    """(alanlar, adet) listesinden tek, çok sayfalı PDF üretir
+
+    Her farklı etiket bir kez form XObject olarak çizilir; kopyalar bu formu
+    referans alan sayfalardır, böylece PDF boyutu kopya sayısıyla büyümez.
+    """
+    total_pages = sum(copies for _, copies in entries)
+    if total_pages > MAX_BATCH_PAGES:
+        raise ValueError(f"En fazla {MAX_BATCH_PAGES} etiket basılabilir (istenen: {total_pages})")
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    form_names = {}
+    for fields, _ in entries:
+        key = content_hash(fields)
+        if key not in form_names:
+            form_names[key] = f"label_{key}"
+            c.beginForm(form_names[key], 0, 0, width, height)
+            draw(c, fields, width, height)
+            c.endForm()
+
+    for fields, copies in entries:
+        form_name = form_names[content_hash(fields)]
+        for _ in range(copies):
+            c.doForm(form_name)
+            c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def render_labels(entries, size=DEFAULT_SIZE):
+    """(ürün, adet) listesi için tek PDF (bytes) döndürür"""
+    if size not in LABEL_SIZES:
+        size = DEFAULT_SIZE
+    width, height = LABEL_SIZES[size]
+    return _render_batch([(label_fields(item), copies) for item, copies in entries], width, height, draw_label)
+
+
+def render_desktop_labels(entries):
+    """(TreeView satırı, adet) listesi için masaüstü düzeninde tek PDF (bytes) döndürür"""
+    width, height = DESKTOP_LABEL_SIZE
+    return _render_batch([(desktop_label_fields(values), copies) for values, copies in entries],
+                         width, height, draw_desktop_label)
+
+
+def _cache_get(key):
+    with _cache_lock:
+        pdf = _cache.get(key)
+        if pdf is not None:
+            _cache.move_to_end(key)
+        return pdf
+
+
+def _cache_put(key, pdf):
+    with _cache_lock:
+        _cache[key] = pdf
+        _cache.move_to_end(key)
+        while len(_cache) > LABEL_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def render_label(item, size=DEFAULT_SIZE):
+    """Ürün etiketini PDF (bytes) olarak döndürür; aynı içerik ve boyut önbellekten gelir"""
+    if size not in LABEL_SIZES:
+        size = DEFAULT_SIZE
+    fields = label_fields(item)
+    key = (content_hash(fields), size)
+    pdf = _cache_get(key)
+    if pdf is not None:
+        return pdf
+
+    width, height = LABEL_SIZES[size]
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    draw_label(c, fields, width, height)
+    c.save()
+    pdf = buffer.getvalue()
+    _cache_put(key, pdf)
+    return pdf
@@ -0,0 +1,245 @@
+"""
+Masaüstü envanter tablosu için sanal (virtual) Treeview
+Treeview'da sadece ekranda görünen satırlar tutulur; satır sırası anahtar listesinde,
+satır değerleri ise kaydırıldıkça sayfa sayfa (SQLite'tan) okunup önbelleklenir
+"""
+
+# Görünür pencerenin üstünde/altında önceden okunacak satır sayısı (pencere yüksekliği katı)
+PREFETCH_SCREENS = 1
+# Bellekte tutulacak en fazla satır değeri; aşılırsa önbellek görünür pencereye küçültülür
+CACHE_ROWS = 5000
+
+# Shift / Control tuş durumu bitleri
+_MODIFIER_MASK = 0x0001 | 0x0004
+
+
+class VirtualTreeview:
+    """Mevcut bir ttk.Treeview'u sanal listeye çevirir
+
+    keys: satırların görüntülenme sırası (ör. rowid listesi) - Tk öğesi değil, düz Python listesi
+    fetch(keys) -> {anahtar: değerler}: eksik satırların değerlerini okur
+    Treeview öğe iid'leri str(anahtar)'dır; tree.item(iid, "values") görünür satırlar için çalışır.
+    """
+
+    def __init__(self, tree, scrollbar, fetch, row_height=25):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch = fetch
+        self.row_height = row_height
+        self.keys = []
+        self.offset = 0
+        self._index = None  # anahtar -> konum (ihtiyaç olunca hesaplanır)
+        self._cache = {}
+        self._window = []
+        self._selection = set()
+        self._focus = None
+
+        tree.configure(yscrollcommand="")
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", lambda event: self.render(), add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<Button-1>", self._on_click, add="+")
+        tree.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        tree.bind("<Button-4>", lambda event: self._scroll_units(-3), add="+")
+        tree.bind("<Button-5>", lambda event: self._scroll_units(3), add="+")
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
+
+    def set_keys(self, keys, values=None):
+        """Listeyi yeni satır sırasıyla değiştirir; values verilirse önbelleğe alınır (ek okuma yapılmaz)"""
+        self.keys = list(keys)
+        self._index = None
+        self._cache = dict(values) if values else {}
+        self._selection.clear()
+        self._focus = None
+        self.offset = 0
+        self.render(force=True)
+
+    def append_keys(self, keys):
+        """Listenin sonuna satır ekler (arka planda parça parça okunan listeler için)"""
+        if not keys:
+            return
+        self.keys.extend(keys)
+        self._index = None
+        self.render()
+
+    def update_rows(self, values):
+        """Değişen satırların değerlerini yeniler; sadece görünen satırlar Treeview'da güncellenir"""
+        for key, row_values in values.items():
+            if key in self._cache or key in self._window:
+                self._cache[key] = row_values
+            if key in self._window:
+                self.tree.item(str(key), values=row_values)
+
+    def insert_rows(self, keys, values, index=0):
+        """Yeni satırları verilen konuma ekler"""
+        keys = [key for key in keys if key in values]
+        if not keys:
+            return
+        self.keys[index:index] = keys
+        # Pencerenin üstüne eklenen satırlar görünen satırları kaydırmasın
+        if index < self.offset:
+            self.offset += len(keys)
+        self._index = None
+        self._cache.update(values)
+        self.render()
+
+    def remove_rows(self, keys):
+        """Silinen satırları listeden çıkarır"""
+        removed = set(keys)
+        if not removed:
+            return
+        self.offset -= sum(1 for key in self.keys[:self.offset] if key in removed)
+        self.keys = [key for key in self.keys if key not in removed]
+        self._index = None
+        for key in removed:
+            self._cache.pop(key, None)
+        self._selection -= removed
+        if self._focus in removed:
+            self._focus = None
+        self.render()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index_of(self, key):
+        if self._index is None:
+            self._index = {k: i for i, k in enumerate(self.keys)}
+        return self._index.get(key)
+
+    def key_of(self, iid):
+        """Treeview iid'sinden anahtar (görünür satırlar için)"""
+        for key in self._window:
+            if str(key) == iid:
+                return key
+        return None
+
+    # ------------------------------------------------------------------
+    # Görüntüleme
+    # ------------------------------------------------------------------
+
+    def visible_rows(self):
+        height = self.tree.winfo_height()
+        if height <= 1:  # Henüz çizilmedi - Treeview'un istenen satır sayısı
+            return int(self.tree.cget("height"))
+        # Başlık satırı da bir satır yüksekliği kadar yer kaplar
+        return max(1, height // self.row_height - 1)
+
+    def _clamp(self, offset):
+        return max(0, min(offset, len(self.keys) - self.visible_rows()))
+
+    def _load(self, start, end):
+        """[start, end) aralığında önbellekte olmayan satırları okur"""
+        missing = [key for key in self.keys[start:end] if key not in self._cache]
+        if not missing:
+            return
+        if len(self._cache) + len(missing) > CACHE_ROWS:
+            window = set(self.keys[self.offset:self.offset + self.visible_rows()])
+            self._cache = {key: value for key, value in self._cache.items() if key in window}
+        self._cache.update(self.fetch(missing))
+
+    def render(self, force=False):
+        """Görünür penceredeki satırları Treeview'a yazar; pencere değişmediyse bir şey yapmaz"""
+        count = self.visible_rows()
+        self.offset = self._clamp(self.offset)
+        window = self.keys[self.offset:self.offset + count]
+
+        if force or window != self._window:
+            if any(key not in self._cache for key in window):
+                margin = count * PREFETCH_SCREENS
+                self._load(max(0, self.offset - margin), self.offset + count + margin)
+            children = self.tree.get_children()
+            if children:
+                self.tree.delete(*children)
+            for key in window:
+                values = self._cache.get(key)
+                if values is not None:
+                    self.tree.insert("", "end", iid=str(key), values=values)
+            self._window = window
+
+            visible = [str(key) for key in window if key in self._selection]
+            if visible:
+                self.tree.selection_set(visible)
+            if self._focus in window:
+                self.tree.focus(str(self._focus))
+
+        total = len(self.keys)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + count) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, offset):
+        self.offset = self._clamp(offset)
+        self.render()
+
+    def see(self, key, center=False):
+        """Anahtarın satırını görünür pencereye getirir"""
+        index = self.index_of(key)
+        if index is None:
+            return
+        count = self.visible_rows()
+        if center:
+            self.scroll_to(index - count // 2)
+        elif index < self.offset:
+            self.scroll_to(index)
+        elif index >= self.offset + count:
+            self.scroll_to(index - count + 1)
+
+    def select(self, key):
+        """Tek bir satırı seçer, odaklar ve görünür yapar"""
+        self._selection = {key}
+        self._focus = key
+        self.see(key)
+        self.tree.selection_set(str(key))
+        self.tree.focus(str(key))
+
+    def move_selection(self, delta):
+        """Seçimi delta satır kaydırır (Page Up/Down, Home/End için)"""
+        if not self.keys:
+            return
+        index = self.index_of(self._focus) if self._focus is not None else None
+        index = 0 if index is None else index
+        self.select(self.keys[max(0, min(len(self.keys) - 1, index + delta))])
+
+    # ------------------------------------------------------------------
+    # Olaylar
+    # ------------------------------------------------------------------
+
+    def yview(self, *args):
+        """Scrollbar komutu: ('moveto', kesir) veya ('scroll', n, 'units'|'pages')"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.keys)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_rows()
+            self._scroll_units(amount)
+
+    def _scroll_units(self, amount):
+        self.scroll_to(self.offset + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows'ta delta 120'nin katları, macOS'ta küçük tam sayılar
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_units(-3 * step)
+
+    def _on_click(self, event):
+        # Değiştirici tuş yoksa yeni tıklama önceki (ekran dışı) seçimi de kaldırır
+        if not event.state & _MODIFIER_MASK:
+            self._selection.clear()
+
+    def _on_select(self, event=None):
+        # Olay kuyruktan işlendiğinde Treeview'daki seçim güncel pencereye aittir
+        window = set(self._window)
+        selected = {self.key_of(iid) for iid in self.tree.selection()}
+        self._selection = (self._selection - window) | (selected - {None})
+        focus = self.key_of(self.tree.focus())
+        if focus is not None:
+            self._focus = focus
+
@@ -0,0 +1,326 @@
+"""
+app.py ve flaskapi.py için ortak HTTP yardımcıları
+"""
+
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from functools import partial
+
+from flask import Response, jsonify, request, send_from_directory
+
+# brotli import (opsiyonel - yoksa sadece gzip kullanılır)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except Exception:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+# msgpack import (opsiyonel - yoksa mobil API sadece JSON döndürür)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except Exception:
+    MSGPACK_AVAILABLE = False
+    msgpack = None
+
+# Değişmeyen dosyalar için önbellek süresi (1 yıl)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Yükleme dosya adları zaman damgası içerir: product_<item_number>_<id>_<timestamp>.<ext>
+_TIMESTAMPED_UPLOAD = re.compile(r"^product_.+_\d+_\d{9,}\.[A-Za-z0-9]+$")
+# Resim kopyaları içerik özetiyle adlandırılır: <sha1>_<boyut>.<ext>
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{40}_[a-z]+\.(webp|jpg)$")
+
+
+def is_immutable_filename(filename):
+    """Dosya adı içeriği değişmeyen bir dosyayı mı gösteriyor (zaman damgalı veya içerik özetli)"""
+    return bool(_TIMESTAMPED_UPLOAD.match(filename) or _CONTENT_ADDRESSED.match(filename))
+
+
+def send_cached_file(directory, filename, immutable=None):
+    """Dosyayı ETag/Last-Modified doğrulayıcıları ve Range desteğiyle gönderir
+
+    Değişmeyen dosyalar bir yıl boyunca önbellekte tutulur (Cache-Control: immutable);
+    diğerleri her seferinde doğrulanır ve değişmemişse 304 döner.
+    """
+    if immutable is None:
+        immutable = is_immutable_filename(filename)
+    # conditional=True: If-None-Match / If-Modified-Since -> 304, Range -> 206
+    response = send_from_directory(
+        directory, filename, conditional=True, etag=True,
+        max_age=IMMUTABLE_MAX_AGE if immutable else 0,
+    )
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def cached_bytes_response(data, mimetype):
+    """Bellekteki veriyi ETag ile gönderir, istemcide aynısı varsa 304 döner"""
+    response = Response(data, mimetype=mimetype)
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def conditional_json(payload, status=200):
+    """JSON yanıtını ETag ile gönderir, istemcide aynısı varsa 304 döner"""
+    response = jsonify(payload)
+    response.status_code = status
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def stream_rows(conn, chunks, mimetype, filename=None):
+    """Generator'dan gelen parçaları akış olarak gönderir; bağlantı yanıt kapanınca havuza döner"""
+    response = Response(chunks, mimetype=mimetype)
+    # Generator hiç başlamasa bile (istemci erken giderse) bağlantı serbest bırakılır
+    response.call_on_close(conn.close)
+    if filename:
+        response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
+
+
+class VersionedSnapshot:
+    """Bir sürüm numarasına bağlı, serileştirilmiş yanıt gövdesi önbelleği
+
+    build(conn) -> (sürüm, gövde) aynı okuma transaction'ında sürümü ve veriyi okumalıdır.
+    Sürüm değişmedikçe gövde tekrar üretilmez; değiştiğinde eşzamanlı isteklerden
+    sadece biri yeniden üretir, diğerleri onu bekleyip aynı sonucu kullanır.
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self._snapshot = None  # (sürüm, gövde, etag)
+
+    def get(self, conn, version):
+        """(gövde, etag) döndürür; version None ise önbellek kullanılmaz"""
+        snapshot = self._snapshot
+        if version is not None and snapshot is not None and snapshot[0] == version:
+            return snapshot[1], snapshot[2]
+        if version is None:
+            _, body = self._build(conn)
+            return body, hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            snapshot = self._snapshot
+            # Kilidi beklerken başka bir istek yeniden üretmiş olabilir
+            if snapshot is None or snapshot[0] != version:
+                built_version, body = self._build(conn)
+                snapshot = (built_version, body, hashlib.sha1(body).hexdigest())
+                if built_version is not None:
+                    self._snapshot = snapshot
+        return snapshot[1], snapshot[2]
+
+
+def snapshot_response(body, etag, mimetype="application/json", vary=None):
+    """Önbellekteki gövdeyi ETag ile gönderir, istemcide aynısı varsa 304 döner"""
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    if vary:
+        response.vary.add(vary)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+# ---------------------------------------------------------------------------
+# MessagePack yanıtları (Accept: application/msgpack)
+# ---------------------------------------------------------------------------
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+class RowSet:
+    """Yanıttaki satır listesi: JSON'da sözlük listesi, MessagePack'te sütun başlığı + satır dizileri
+
+    MessagePack biçimi: {"columns": ["id", "title", ...], "rows": [[1, "..."], ...]}
+    Sütun adları her satırda tekrarlanmadığı için gövde küçülür, istemci de daha hızlı çözer.
+    """
+
+    def __init__(self, rows, columns=None):
+        self.rows = rows
+        if columns is None:
+            columns = list(rows[0].keys()) if rows else []
+        self.columns = list(columns)
+
+    def as_dicts(self):
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def as_table(self):
+        return {"columns": self.columns, "rows": [list(row) for row in self.rows]}
+
+
+def wants_msgpack():
+    """İstemci Accept başlığında MessagePack'i JSON'a tercih ediyor mu (eşitlikte JSON)"""
+    if not MSGPACK_AVAILABLE:
+        return False
+    return request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+def _prepare(value, binary):
+    if isinstance(value, RowSet):
+        return value.as_table() if binary else value.as_dicts()
+    if isinstance(value, dict):
+        return {key: _prepare(item, binary) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_prepare(item, binary) for item in value]
+    return value
+
+
+def api_response(payload, status=200, conditional=False):
+    """Mobil API yanıtı: Accept başlığına göre JSON (varsayılan) veya MessagePack
+
+    payload içindeki RowSet değerleri seçilen biçime göre kodlanır.
+    conditional=True ise ETag eklenir ve istemcide aynısı varsa 304 döner.
+    """
+    binary = wants_msgpack()
+    if binary:
+        response = Response(msgpack.packb(_prepare(payload, True), use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(_prepare(payload, False))
+    response.status_code = status
+    response.vary.add("Accept")
+    if conditional:
+        response.add_etag()
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return response
+
+
+def request_payload():
+    """İstek gövdesi: Content-Type application/msgpack ise MessagePack, değilse JSON; çözülemezse None"""
+    if request.mimetype == MSGPACK_MIMETYPE:
+        if not MSGPACK_AVAILABLE:
+            return None
+        try:
+            return msgpack.unpackb(request.get_data(), raw=False)
+        except Exception:
+            return None
+    return request.get_json(silent=True)
+
+
+# ---------------------------------------------------------------------------
+# Yanıt sıkıştırma (gzip / brotli)
+# ---------------------------------------------------------------------------
+
+# Bu boyutun altındaki yanıtlar sıkıştırılmaz - kazanç CPU maliyetine değmez
+COMPRESS_MIN_SIZE = 1024
+# Sıkıştırılmış gövde önbelleğinin üst sınırı (bayt)
+COMPRESS_CACHE_BYTES = 32 * 1024 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/x-ndjson",
+    "application/xml", "image/svg+xml", "application/msgpack",
+)
+
+_compressed_cache = OrderedDict()
+_compressed_cache_bytes = 0
+_compressed_cache_lock = threading.Lock()
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if BROTLI_AVAILABLE and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip başlığıyla
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_cached(response, data, encoding):
+    """Aynı gövde tekrar sıkıştırılmaz - anahtar güçlü ETag veya gövdenin özeti"""
+    global _compressed_cache_bytes
+    etag, weak = response.get_etag()
+    digest = etag if etag and not weak else hashlib.sha1(data).hexdigest()
+    key = (digest, len(data), encoding)
+    with _compressed_cache_lock:
+        body = _compressed_cache.get(key)
+        if body is not None:
+            _compressed_cache.move_to_end(key)
+            return body
+
+    body = _compress(data, encoding)
+    with _compressed_cache_lock:
+        if key not in _compressed_cache and len(body) <= COMPRESS_CACHE_BYTES // 4:
+            _compressed_cache[key] = body
+            _compressed_cache_bytes += len(body)
+            while _compressed_cache_bytes > COMPRESS_CACHE_BYTES:
+                _, evicted = _compressed_cache.popitem(last=False)
+                _compressed_cache_bytes -= len(evicted)
+    return body
+
+
+def _compress_stream(chunks, encoding):
+    """Akış yanıtlarını parça parça sıkıştırır; her parça hemen istemciye iletilir"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        compress = compressor.compress
+        flush = partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compress(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response):
+    """after_request kancası: istemci destekliyorsa metin yanıtlarını gzip/brotli ile sıkıştırır"""
+    if (request.method == "HEAD"
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(_COMPRESSIBLE_TYPES)):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(_compress_cached(response, data, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+    # Gövde kodlamaya göre değiştiği için ETag zayıf olur; If-None-Match zayıf karşılaştırılır
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Flask uygulamasına yanıt sıkıştırmayı ekler"""
+    app.after_request(compress_response)